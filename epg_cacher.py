@@ -6,27 +6,42 @@ missing data from previous versions with configurable time tolerance.
 """
 
 import os
+import io
 import sys
+import bisect
+import copy
+import functools
 import time
 import logging
-import shutil
-import codecs
 import re
 import gzip
 import zipfile
-import tempfile
 import csv
-import xml.etree.ElementTree as ET
-from datetime import datetime, timedelta
+import codecs
+import json
+import shutil
+from datetime import datetime, timedelta, timezone
 from typing import Optional, Dict, List, Tuple
+from concurrent.futures import ThreadPoolExecutor
 import requests
-import schedule
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from lxml import etree as ET
 from croniter import croniter
-import urllib.parse
 import unicodedata
 
 
 class EPGCacher:
+    # Everything outside XML 1.0 Char: #x9 | #xA | #xD | [#x20-#xD7FF] | [#xE000-#xFFFD] | [#x10000-#x10FFFF]
+    INVALID_XML_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ud800-\udfff\ufffe\uffff]')
+    # Byte translation table turning the same control characters (all single bytes) into spaces
+    INVALID_XML_BYTES_TABLE = bytes(b if b in (0x09, 0x0A, 0x0D) or b >= 0x20 else 0x20 for b in range(256))
+    # UTF-8 encoding of the noncharacters U+FFFE and U+FFFF (surrogates never survive a strict UTF-8 decode)
+    INVALID_XML_UTF8_NONCHARS = re.compile(rb'\xef\xbf[\xbe\xbf]')
+    
+    # XMLTV timestamp, optionally followed by a UTC offset: "20240101203000 +0100"
+    XMLTV_DATETIME = re.compile(r'(\d{4})(\d{2})(\d{2})(\d{2})(\d{2})(\d{2})(?: ([+-])(\d{2})(\d{2}))?', re.ASCII)
+
     def __init__(self):
         """Initialize the EPG Cacher with environment variables and logging."""
         # Environment variables
@@ -40,18 +55,31 @@ class EPGCacher:
         
         self.epg2_url = os.getenv("EPG2_URL")  # Optional second EPG URL for images
         self.time_tolerance_minutes = int(os.getenv("TIME_TOLERANCE_MINUTES", "10"))
+        self.time_tolerance = timedelta(minutes=self.time_tolerance_minutes)
         
-        # File paths
+        # File paths (resolved once; the output directory is created here and nowhere else)
         output_dir = "output"
         os.makedirs(output_dir, exist_ok=True)
+        self.output_dir = output_dir
         self.epg_file_escaped = os.path.join(output_dir, "epg.xml")
         self.epg_file = os.path.join(output_dir, "epg_unescaped.xml")
         self.simpleiptv_file = os.path.join(output_dir, "SimpleIPTV.m3u8")
+        self.simpleiptv_download_file = os.path.join(output_dir, "SimpleIPTV.download")
         self.epg_old_file = os.path.join(output_dir, "epg_old.xml")
         self.channel_id_mapping_file = os.path.join(output_dir, "channel_id_mapping.csv")
         self.channel_mapping_file = os.path.join(output_dir, "channel_mapping.csv")
         self.channels_epg1_file = os.path.join(output_dir, "channels_epg1.csv")
         self.channels_epg2_file = os.path.join(output_dir, "channels_epg2.csv")
+        self.epg_source_cache_file = os.path.join(output_dir, "epg_source.cache")
+        self.epg2_source_cache_file = os.path.join(output_dir, "epg2_source.cache")
+        
+        # Whether the last fetch of each source was answered with 304 Not Modified
+        self.epg_not_modified = False
+        self.epg2_not_modified = False
+        
+        # Channel mapping mtime the last completed update was built with
+        self.update_completed = False
+        self.last_update_mapping_mtime = None
         
         # Setup logging
         self.setup_logging()
@@ -60,13 +88,32 @@ class EPGCacher:
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'EPG-Cacher/1.0',
-            'Accept': 'application/xml, text/xml, */*'
+            'Accept': 'application/xml, text/xml, */*',
+            'Accept-Encoding': 'gzip, deflate'
         })
         
+        # Keep-alive pool shared by both EPG fetches, with retries on transient server errors
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=8,
+            max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=(500, 502, 503, 504))
+        )
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        
+        # Raw channel ID -> Plex-safe ID, loaded from channel_id_mapping.csv on first use
+        self.plex_channel_ids = None
+        self.plex_used_ids = set()
+        self.plex_next_counter = 1
+        
+        # Worker pool so the image EPG and the playlist download while the main EPG is fetched and merged
+        self.fetch_executor = ThreadPoolExecutor(max_workers=3, thread_name_prefix='epg-fetch')
+        
         # Create sample channel mapping file if none exists
         self.create_sample_channel_mapping()
         
         # Load channel mapping if available
+        self.channel_mapping_mtime = self.get_channel_mapping_mtime()
         self.channel_mapping = self.load_channel_mapping()
         
         epg2_info = f", Image EPG: {self.epg2_url}" if self.epg2_url else ", No image EPG"
@@ -100,12 +147,48 @@ class EPGCacher:
         now = datetime.now()
         base = now - timedelta(seconds=grace_period)
         
-        # Get previous scheduled run
-        itr = croniter(cron_expr, base)
-        prev_time = itr.get_next(datetime)
+        # Get previous scheduled run; cron has minute resolution, so the next fire time
+        # after base is the same for every base within one minute
+        prev_time = self._next_cron_time(cron_expr, base.replace(second=0, microsecond=0))
 
         return abs((prev_time - now).total_seconds()) <= grace_period
 
+    @staticmethod
+    @functools.lru_cache(maxsize=16)
+    def _next_cron_time(cron_expr: str, base: datetime) -> datetime:
+        """
+        Compute the first cron fire time after base, memoized per expression and minute.
+        
+        Args:
+            cron_expr: A standard cron string
+            base: Minute-aligned datetime to search from
+            
+        Returns:
+            Next scheduled datetime after base
+        """
+        return croniter(cron_expr, base).get_next(datetime)
+
+    def get_channel_mapping_mtime(self) -> Optional[int]:
+        """
+        Get the modification time of the channel mapping file.
+        
+        Returns:
+            Modification time in nanoseconds, None if the file does not exist
+        """
+        try:
+            return os.stat(self.channel_mapping_file).st_mtime_ns
+        except OSError:
+            return None
+
+    def refresh_channel_mapping(self):
+        """Reload the channel mapping if the file changed since it was last loaded (e.g. via the web UI)."""
+        mtime = self.get_channel_mapping_mtime()
+        if mtime == self.channel_mapping_mtime:
+            return
+        
+        self.channel_mapping_mtime = mtime
+        self.channel_mapping = self.load_channel_mapping()
+
     def load_channel_mapping(self) -> Dict[str, str]:
         """
         Load channel mapping from CSV file.
@@ -115,10 +198,6 @@ class EPGCacher:
         """
         mapping = {}
         
-        if not os.path.exists(self.channel_mapping_file):
-            self.logger.info(f"No channel mapping file found at {self.channel_mapping_file}")
-            return mapping
-        
         try:
             with open(self.channel_mapping_file, 'r', encoding='utf-8') as f:
                 reader = csv.reader(f)
@@ -126,13 +205,15 @@ class EPGCacher:
                 
                 for row in reader:
                     if len(row) >= 2:
-                        epg1_channel = row[0].strip()
-                        epg2_channel = row[1].strip()
+                        epg1_channel = self.normalize_nfc(row[0].strip())
+                        epg2_channel = self.normalize_nfc(row[1].strip())
                         if epg1_channel and epg2_channel:
                             mapping[epg1_channel] = epg2_channel
             
             self.logger.info(f"Loaded {len(mapping)} channel mappings from {self.channel_mapping_file}")
             
+        except FileNotFoundError:
+            self.logger.info(f"No channel mapping file found at {self.channel_mapping_file}")
         except Exception as e:
             self.logger.error(f"Error loading channel mapping file: {e}")
         
@@ -146,107 +227,82 @@ class EPGCacher:
             epg_root: Parsed XML root from EPG1 source
         """
         try:
-            # Extract channel IDs from EPG1
-            channel_data = []
-            
-            # Get channels from channel elements
-            for channel in epg_root.findall('.//channel'):
-                channel_id = channel.get('id', '').strip()
-                if channel_id:
-                    # Try to get channel name from display-name element
-                    channel_name = ""
-                    display_name = channel.find('display-name')
-                    if display_name is not None and display_name.text:
-                        channel_name = display_name.text.strip()
-                    
-                    channel_data.append((channel_id, channel_name))
-            
-            # Also get unique channels from programme elements (in case channels are only in programmes)
-            programme_channels = set()
-            for programme in epg_root.findall('.//programme'):
-                channel_id = programme.get('channel', '').strip()
-                if channel_id:
-                    programme_channels.add(channel_id)
+            # Extract channel IDs from EPG1 in one walk over channel and programme elements
+            # (XMLTV keeps both as direct children of <tv>, so their subtrees are not visited)
+            channel_names = {}
+            programme_channels = {}
+            
+            for elem in epg_root.iterchildren('channel', 'programme'):
+                if elem.tag == 'channel':
+                    channel_id = elem.get('id', '').strip()
+                    if channel_id and channel_id not in channel_names:
+                        # Try to get channel name from display-name element
+                        channel_name = ""
+                        display_name = elem.find('display-name')
+                        if display_name is not None and display_name.text:
+                            channel_name = display_name.text.strip()
+                        
+                        channel_names[channel_id] = channel_name
+                else:
+                    # Also collect channels that only appear in programmes
+                    channel_id = elem.get('channel', '').strip()
+                    if channel_id:
+                        programme_channels[channel_id] = ""
             
-            # Add programme channels that weren't in channel elements
-            existing_channel_ids = {ch_id for ch_id, _ in channel_data}
-            for channel_id in programme_channels:
-                if channel_id not in existing_channel_ids:
-                    channel_data.append((channel_id, ""))
+            # Channel elements take precedence over IDs only seen on programmes
+            programme_channels.update(channel_names)
+            channel_data = list(programme_channels.items())
             
             if not channel_data:
                 self.logger.info("No channel IDs found in EPG1")
                 return
             
-            # Sort for consistent output
-            channel_data.sort(key=lambda x: x[0])
+            # Sort for consistent output; IDs are unique, so plain tuple order is ID order
+            channel_data.sort()
             
-            # Write to channels_epg1.csv
-            with open(self.channels_epg1_file, 'w', encoding='utf-8', newline='') as f:
+            # Write to channels_epg1.csv through a temporary file, so the web UI never reads a partial file
+            tmp_file = self.channels_epg1_file + ".tmp"
+            with open(tmp_file, 'w', encoding='utf-8', newline='', buffering=1 << 20) as f:
                 writer = csv.writer(f)
                 
                 # Write header
                 writer.writerow(['EPG1_Channel_ID', 'Channel_Name'])
                 
                 # Write channel data
-                for channel_id, channel_name in channel_data:
-                    writer.writerow([channel_id, channel_name])
+                writer.writerows(channel_data)
+            os.replace(tmp_file, self.channels_epg1_file)
             
             self.logger.info(f"Saved {len(channel_data)} EPG1 channels to {self.channels_epg1_file}")
             
         except Exception as e:
             self.logger.error(f"Error saving EPG1 channels to CSV: {e}")
 
-    def save_epg2_channels_to_csv(self, epg2_root: ET.Element):
+    def save_epg2_channels_to_csv(self, channel_data: List[Tuple[str, str]]):
         """
         Save EPG2 channel IDs to channels_epg2.csv.
         
         Args:
-            epg2_root: Parsed XML root from EPG2 source
+            channel_data: List of (channel ID, channel name) tuples collected from EPG2
         """
         try:
-            # Extract channel data from EPG2
-            channel_data = []
-            
-            # Get channels from channel elements
-            channel_ids_seen = set()
-            for channel in epg2_root.findall('.//channel'):
-                channel_id = channel.get('id', '').strip()
-                if channel_id and channel_id not in channel_ids_seen:
-                    channel_ids_seen.add(channel_id)
-                    
-                    # Try to get channel name from display-name element
-                    channel_name = ""
-                    display_name = channel.find('display-name')
-                    if display_name is not None and display_name.text:
-                        channel_name = display_name.text.strip()
-                    
-                    channel_data.append((channel_id, channel_name))
-            
-            # Also get channels from programme elements (in case channels are only in programmes)
-            for programme in epg2_root.findall('.//programme'):
-                channel_id = programme.get('channel', '').strip()
-                if channel_id and channel_id not in channel_ids_seen:
-                    channel_ids_seen.add(channel_id)
-                    channel_data.append((channel_id, ""))
-            
             if not channel_data:
                 self.logger.info("No channel IDs found in EPG2")
                 return
             
-            # Sort for consistent output
-            channel_data.sort(key=lambda x: x[0])
+            # Sort for consistent output; IDs are unique, so plain tuple order is ID order
+            channel_data.sort()
             
-            # Write to channels_epg2.csv
-            with open(self.channels_epg2_file, 'w', encoding='utf-8', newline='') as f:
+            # Write to channels_epg2.csv through a temporary file, so the web UI never reads a partial file
+            tmp_file = self.channels_epg2_file + ".tmp"
+            with open(tmp_file, 'w', encoding='utf-8', newline='', buffering=1 << 20) as f:
                 writer = csv.writer(f)
                 
                 # Write header
                 writer.writerow(['EPG2_Channel_ID', 'Channel_Name'])
                 
                 # Write channel data
-                for channel_id, channel_name in channel_data:
-                    writer.writerow([channel_id, channel_name])
+                writer.writerows(channel_data)
+            os.replace(tmp_file, self.channels_epg2_file)
             
             self.logger.info(f"Saved {len(channel_data)} EPG2 channels to {self.channels_epg2_file}")
             
@@ -257,16 +313,16 @@ class EPGCacher:
         """
         Create an empty channel mapping CSV file with just the header row.
         """
-        if os.path.exists(self.channel_mapping_file):
-            return  # Don't overwrite existing file
-        
         try:
-            with open(self.channel_mapping_file, 'w', newline='', encoding='utf-8') as f:
+            # Exclusive creation fails if the file exists, so it is never overwritten
+            with open(self.channel_mapping_file, 'x', newline='', encoding='utf-8') as f:
                 writer = csv.writer(f)
                 writer.writerow(['EPG1_Channel_ID', 'EPG2_Channel_ID'])
             
             self.logger.info(f"Created empty channel mapping file: {self.channel_mapping_file}")
             
+        except FileExistsError:
+            return  # Don't overwrite existing file
         except Exception as e:
             self.logger.error(f"Error creating channel mapping file: {e}")
 
@@ -283,53 +339,175 @@ class EPGCacher:
         if not text:
             return ""
         
-        # Remove or replace invalid XML characters
-        # XML 1.0 valid characters: #x9 | #xA | #xD | [#x20-#xD7FF] | [#xE000-#xFFFD] | [#x10000-#x10FFFF]
-        valid_chars = []
-        for char in text:
-            code = ord(char)
-            if (code == 0x09 or code == 0x0A or code == 0x0D or 
-                (0x20 <= code <= 0xD7FF) or 
-                (0xE000 <= code <= 0xFFFD) or 
-                (0x10000 <= code <= 0x10FFFF)):
-                valid_chars.append(char)
-            else:
-                # Replace invalid characters with space
-                valid_chars.append(' ')
+        # Replace characters that are invalid in XML 1.0 with a space; lone surrogates
+        # are covered too, so the result always encodes cleanly as UTF-8
+        sanitized = self.INVALID_XML_CHARS.sub(' ', text)
+        
+        # NFC so channel IDs compare equal to the (also NFC) channel mapping keys
+        return self.normalize_nfc(sanitized)
+
+    def sanitize_bytes(self, data: bytes) -> bytes:
+        """
+        Replace control characters that are invalid in XML with spaces, byte for byte.
+        
+        Only valid for ASCII or UTF-8 data, where these characters are single bytes and
+        never part of a multi-byte sequence.
         
-        sanitized = ''.join(valid_chars)
+        Args:
+            data: Raw bytes to sanitize
+            
+        Returns:
+            Sanitized bytes (the same object when nothing had to be replaced)
+        """
+        return data.translate(self.INVALID_XML_BYTES_TABLE)
+
+    def sanitize_utf8_bytes(self, data: bytes) -> Optional[bytes]:
+        """
+        Sanitize UTF-8 encoded data without running the character regex over decoded text.
+        
+        Control characters are replaced with sanitize_bytes(), the noncharacters
+        U+FFFE/U+FFFF with a bytes regex, and the text is only re-encoded when it
+        is not already NFC.
+        
+        Args:
+            data: Raw UTF-8 bytes to sanitize
+            
+        Returns:
+            Sanitized NFC UTF-8 bytes, None if data is not valid UTF-8
+        """
+        sanitized = self.INVALID_XML_UTF8_NONCHARS.sub(b' ', self.sanitize_bytes(data))
         
-        # Ensure proper UTF-8 encoding
         try:
-            # Encode to bytes and decode back to ensure valid UTF-8
-            sanitized = sanitized.encode('utf-8', errors='replace').decode('utf-8')
-        except UnicodeError:
-            self.logger.warning("UTF-8 encoding error during sanitization")
-            sanitized = sanitized.encode('utf-8', errors='ignore').decode('utf-8')
+            text = sanitized.decode('utf-8')
+        except UnicodeDecodeError:
+            return None
+        
+        if unicodedata.is_normalized('NFC', text):
+            return sanitized
+        return unicodedata.normalize('NFC', text).encode('utf-8')
+
+    def normalize_nfc(self, text: str) -> str:
+        """
+        Normalize text to Unicode NFC, skipping the work when it already is.
         
-        return sanitized
+        Args:
+            text: Text to normalize
+            
+        Returns:
+            NFC normalized text
+        """
+        # is_normalized uses the quick check, which is nearly free for ASCII
+        if unicodedata.is_normalized('NFC', text):
+            return text
+        return unicodedata.normalize('NFC', text)
 
-    def fetch_epg_data(self) -> Optional[str]:
+    def fetch_url_cached(self, url: str, cache_file: str) -> Tuple[bytes, Optional[str], bool]:
+        """
+        Download a URL with a conditional GET backed by an on-disk copy.
+        
+        The last response body is kept in cache_file with its ETag/Last-Modified
+        in a sidecar metadata file. When the server answers 304 Not Modified the
+        cached body is returned instead of transferring the document again.
+        
+        Args:
+            url: URL to download
+            cache_file: Path of the cached response body
+            
+        Returns:
+            Tuple of (response body, response encoding, whether the server answered 304)
+            
+        Raises:
+            requests.exceptions.RequestException: On network or HTTP errors
+        """
+        meta_file = cache_file + ".meta.json"
+        meta = {}
+        headers = {}
+        
+        if os.path.exists(cache_file) and os.path.exists(meta_file):
+            try:
+                with open(meta_file, 'r', encoding='utf-8') as f:
+                    meta = json.load(f)
+            except (OSError, ValueError) as e:
+                self.logger.warning(f"Ignoring unreadable cache metadata {meta_file}: {e}")
+                meta = {}
+            
+            # Validators only apply to the URL they were stored for
+            if meta.get('url') == url:
+                if meta.get('etag'):
+                    headers['If-None-Match'] = meta['etag']
+                if meta.get('last_modified'):
+                    headers['If-Modified-Since'] = meta['last_modified']
+        
+        response = self.session.get(url, timeout=60, headers=headers)
+        
+        if response.status_code == 304 and headers:
+            self.logger.info(f"{url} not modified, using cached copy {cache_file}")
+            with open(cache_file, 'rb') as f:
+                return f.read(), meta.get('encoding'), True
+        
+        response.raise_for_status()
+        content = response.content
+        
+        # urllib3 has already undone any transfer compression negotiated via Accept-Encoding
+        content_encoding = response.headers.get('Content-Encoding', 'identity')
+        self.logger.info(f"Downloaded {url}: {len(content)} bytes (Content-Encoding: {content_encoding})")
+        
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if etag or last_modified:
+            try:
+                # Replace the body before its metadata, so validators never describe a partial body
+                with open(cache_file + ".tmp", 'wb') as f:
+                    f.write(content)
+                os.replace(cache_file + ".tmp", cache_file)
+                with open(meta_file + ".tmp", 'w', encoding='utf-8') as f:
+                    json.dump({
+                        'url': url,
+                        'etag': etag,
+                        'last_modified': last_modified,
+                        'encoding': response.encoding
+                    }, f)
+                os.replace(meta_file + ".tmp", meta_file)
+            except OSError as e:
+                self.logger.warning(f"Could not cache response for {url}: {e}")
+        
+        return content, response.encoding, False
+
+    def fetch_epg_data(self) -> Optional[bytes]:
         """
         Fetch EPG data from the configured URL.
         
         Returns:
-            Raw EPG XML data as string, None if fetch failed
+            Sanitized EPG XML data as UTF-8 bytes, None if fetch failed
         """
+        # Only a successful fetch may report the source as unchanged
+        self.epg_not_modified = False
+        
         try:
             self.logger.info(f"Fetching EPG data from {self.epg_url}")
             
             if not self.epg_url:
                 raise ValueError("EPG_URL is not configured")
             
-            response = self.session.get(self.epg_url, timeout=60)
-            response.raise_for_status()
-            
             # Get content with proper encoding detection
-            content = response.content
+            content, response_encoding, self.epg_not_modified = self.fetch_url_cached(self.epg_url, self.epg_source_cache_file)
+            
+            # Plain ASCII is already valid NFC UTF-8 in any ASCII-compatible encoding, so it
+            # only needs its control characters replaced, without a decode/encode pass
+            if content.isascii():
+                sanitized_content = self.sanitize_bytes(content)
+                self.logger.info(f"Successfully fetched EPG data: {len(sanitized_content)} bytes")
+                return sanitized_content
             
             # Try to detect encoding from response headers
-            encoding = response.encoding or 'utf-8'
+            encoding = response_encoding or 'utf-8'
+            
+            # UTF-8 can be sanitized on the bytes, leaving only the NFC check to be done on text
+            if codecs.lookup(encoding).name == 'utf-8':
+                sanitized_content = self.sanitize_utf8_bytes(content)
+                if sanitized_content is not None:
+                    self.logger.info(f"Successfully fetched EPG data: {len(sanitized_content)} bytes")
+                    return sanitized_content
             
             try:
                 # Decode with detected encoding
@@ -340,9 +518,9 @@ class EPGCacher:
                 text_content = content.decode('utf-8', errors='replace')
             
             # Sanitize the content
-            sanitized_content = self.sanitize_utf8(text_content)
+            sanitized_content = self.sanitize_utf8(text_content).encode('utf-8')
             
-            self.logger.info(f"Successfully fetched EPG data: {len(sanitized_content)} characters")
+            self.logger.info(f"Successfully fetched EPG data: {len(sanitized_content)} bytes")
             return sanitized_content
             
         except requests.exceptions.RequestException as e:
@@ -360,6 +538,9 @@ class EPGCacher:
         Returns:
             Raw EPG XML data as string from second URL, None if fetch failed or URL not configured
         """
+        # Only a successful fetch may report the source as unchanged
+        self.epg2_not_modified = False
+        
         if not self.epg2_url:
             self.logger.info("No EPG2_URL configured, skipping image EPG fetch")
             return None
@@ -367,10 +548,9 @@ class EPGCacher:
         try:
             self.logger.info(f"Fetching image EPG data from {self.epg2_url}")
             
-            response = self.session.get(self.epg2_url, timeout=60)
-            response.raise_for_status()
+            raw_content, response_encoding, self.epg2_not_modified = self.fetch_url_cached(self.epg2_url, self.epg2_source_cache_file)
             
-            content = response.content
+            content = raw_content
             
             # Check if content is gzipped
             if content.startswith(b'\x1f\x8b'):
@@ -382,25 +562,22 @@ class EPGCacher:
                     # If the decompressed content is still an archive (like ZIP), handle it
                     if content.startswith(b'PK'):
                         self.logger.info("Detected ZIP archive inside gzip, extracting...")
-                        with tempfile.NamedTemporaryFile() as temp_file:
-                            temp_file.write(content)
-                            temp_file.flush()
+                        # ZipFile reads straight from memory; no temporary file needed
+                        with zipfile.ZipFile(io.BytesIO(content), 'r') as zip_file:
+                            # Find the first XML file in the archive
+                            xml_files = [name for name in zip_file.namelist() if name.lower().endswith('.xml')]
                             
-                            with zipfile.ZipFile(temp_file.name, 'r') as zip_file:
-                                # Find the first XML file in the archive
-                                xml_files = [name for name in zip_file.namelist() if name.lower().endswith('.xml')]
-                                
-                                if xml_files:
-                                    xml_filename = xml_files[0]  # Use the first XML file found
-                                    self.logger.info(f"Extracting XML file: {xml_filename}")
-                                    content = zip_file.read(xml_filename)
-                                else:
-                                    self.logger.error("No XML files found in the ZIP archive")
-                                    return None
+                            if xml_files:
+                                xml_filename = xml_files[0]  # Use the first XML file found
+                                self.logger.info(f"Extracting XML file: {xml_filename}")
+                                content = zip_file.read(xml_filename)
+                            else:
+                                self.logger.error("No XML files found in the ZIP archive")
+                                return None
                     
                 except gzip.BadGzipFile:
                     self.logger.warning("Failed to decompress as gzip, treating as regular content")
-                    content = response.content
+                    content = raw_content
                 except zipfile.BadZipFile:
                     self.logger.warning("Failed to extract ZIP archive, using decompressed content as is")
                 except Exception as e:
@@ -410,7 +587,7 @@ class EPGCacher:
             # Handle content encoding
             try:
                 # Try to detect encoding
-                encoding = response.encoding or 'utf-8'
+                encoding = response_encoding or 'utf-8'
                 
                 # If we have bytes, decode them
                 if isinstance(content, bytes):
@@ -442,10 +619,38 @@ class EPGCacher:
             self.logger.error(f"Unexpected error fetching image EPG data: {e}")
             return None
         
-    def fetch_simpleiptv(self) -> bool:
+    def load_epg2_data(self, download_future) -> Optional[Tuple[List[Tuple[str, str]], Dict[str, List[Tuple[datetime, List[str]]]]]]:
         """
-        Fetch SimpleIPTV M3U8 playlist, sanitize tvg-id using plex_safe_channel_id(),
-        and save to self.simpleiptv_file.
+        Extract the channels and images of the second EPG once it has been fetched.
+        
+        Runs on the fetch pool, so the image EPG is parsed while the main EPG
+        is still being parsed and merged.
+        
+        Args:
+            download_future: Pending fetch_epg2_data() job
+        
+        Returns:
+            Channel data and image map as returned by extract_epg2_data(),
+            None if fetching or parsing failed
+        """
+        epg2_content = download_future.result()
+        if not epg2_content:
+            self.logger.warning("Could not fetch second EPG for images")
+            return None
+        
+        epg2_data = self.extract_epg2_data(epg2_content)
+        if epg2_data is None:
+            self.logger.warning("Could not parse second EPG file for images")
+        return epg2_data
+
+    def download_simpleiptv(self) -> Optional[str]:
+        """
+        Download the SimpleIPTV M3U8 playlist to self.simpleiptv_download_file.
+        
+        Runs on the fetch pool; the body is streamed to disk in chunks.
+        
+        Returns:
+            Encoding of the downloaded playlist, None if the download failed
         """
         try:
             if not self.simpleiptv_url:
@@ -453,104 +658,193 @@ class EPGCacher:
 
             self.logger.info(f"Fetching SimpleIPTV from {self.simpleiptv_url}")
 
-            response = self.session.get(self.simpleiptv_url, timeout=60)
-            response.raise_for_status()
-
-            content = response.content.decode(response.encoding or 'utf-8', errors='replace')
-
-            lines = content.splitlines()
-            updated_lines = []
-
-            for line in lines:
-                if line.startswith("#EXTINF:"):
-                    # Extract tvg-id if present
-                    # Example: #EXTINF:-1 tvg-id="Some Channel" tvg-name="Some Channel" group-title="Movies",Some Channel
-                    parts = line.split(' ')
-                    new_parts = []
-                    for part in parts:
-                        if part.startswith('tvg-id='):
-                            old_id = part.split('=', 1)[1].strip('"')
-                            new_id = self.plex_safe_channel_id(old_id)
-                            new_parts.append(f'tvg-id="{new_id}"')
-                            if old_id != new_id:
-                                self.logger.info(f"Updated tvg-id: {old_id} -> {new_id}")
-                        else:
-                            new_parts.append(part)
-                    line = ' '.join(new_parts)
-                updated_lines.append(line)
+            with self.session.get(self.simpleiptv_url, timeout=60, stream=True) as response:
+                response.raise_for_status()
+                
+                with open(self.simpleiptv_download_file, 'wb') as f:
+                    for chunk in response.iter_content(chunk_size=1 << 16):
+                        f.write(chunk)
+                
+                return response.encoding or 'utf-8'
 
-            # Save updated M3U8
-            os.makedirs(os.path.dirname(self.simpleiptv_file), exist_ok=True)
-            with open(self.simpleiptv_file, 'w', encoding='utf-8') as f:
-                f.write('\n'.join(updated_lines))
+        except requests.exceptions.RequestException as e:
+            self.logger.error(f"Network error fetching SimpleIPTV: {e}")
+            return None
+        except Exception as e:
+            self.logger.error(f"Unexpected error fetching SimpleIPTV: {e}")
+            return None
+
+    def fetch_simpleiptv(self, download_future=None) -> bool:
+        """
+        Fetch SimpleIPTV M3U8 playlist, sanitize tvg-id using plex_safe_channel_id(),
+        and save to self.simpleiptv_file.
+        
+        Args:
+            download_future: Pending download_simpleiptv() job, None to download now
+        """
+        encoding = download_future.result() if download_future is not None else self.download_simpleiptv()
+        if encoding is None:
+            return False
+        
+        try:
+            # Rewrite line by line into a temporary file, so the playlist is never held
+            # in memory as a whole
+            tmp_file = self.simpleiptv_file + ".tmp"
+            with open(self.simpleiptv_download_file, 'r', encoding=encoding, errors='replace') as source, \
+                    open(tmp_file, 'w', encoding='utf-8') as f:
+                for line_number, line in enumerate(source):
+                    line = line.rstrip('\n')
+                    
+                    if line.startswith("#EXTINF:"):
+                        # Extract tvg-id if present
+                        # Example: #EXTINF:-1 tvg-id="Some Channel" tvg-name="Some Channel" group-title="Movies",Some Channel
+                        parts = line.split(' ')
+                        new_parts = []
+                        for part in parts:
+                            if part.startswith('tvg-id='):
+                                old_id = part.split('=', 1)[1].strip('"')
+                                new_id = self.plex_safe_channel_id(old_id)
+                                new_parts.append(f'tvg-id="{new_id}"')
+                                if old_id != new_id:
+                                    self.logger.info(f"Updated tvg-id: {old_id} -> {new_id}")
+                            else:
+                                new_parts.append(part)
+                        line = ' '.join(new_parts)
+                    
+                    if line_number:
+                        f.write('\n')
+                    f.write(line)
+            
+            # Only replace the previous playlist once it has been rewritten completely
+            os.replace(tmp_file, self.simpleiptv_file)
+            os.remove(self.simpleiptv_download_file)
 
             self.logger.info(f"Successfully saved SimpleIPTV playlist to {self.simpleiptv_file}")
             return True
 
-        except requests.exceptions.RequestException as e:
-            self.logger.error(f"Network error fetching SimpleIPTV: {e}")
-            return False
         except Exception as e:
-            self.logger.error(f"Unexpected error fetching SimpleIPTV: {e}")
+            self.logger.error(f"Unexpected error saving SimpleIPTV: {e}")
             return False
 
-    def extract_programme_images(self, epg2_root: ET.Element) -> Dict[str, List[str]]:
+    def iterparse_epg(self, source):
+        """
+        Stream <channel> and <programme> elements from EPG XML.
+        
+        Each element is cleared once the caller has consumed it, so only the
+        element being processed is kept in memory instead of the whole tree.
+        
+        Args:
+            source: Path of a UTF-8 EPG file or a binary file object
+            
+        Yields:
+            Fully parsed channel and programme elements in document order
+        """
+        context = ET.iterparse(source, events=('end',), tag=('channel', 'programme'), encoding='utf-8',
+                               huge_tree=True, remove_blank_text=True, recover=True)
+        for _, elem in context:
+            yield elem
+            
+            # Free the element and any already processed siblings
+            elem.clear(keep_tail=True)
+            while elem.getprevious() is not None:
+                del elem.getparent()[0]
+
+    def get_programme_images(self, programme: ET.Element) -> List[str]:
         """
-        Extract programme images from the second EPG.
+        Collect image URLs from a programme element.
         
         Args:
-            epg2_root: Parsed XML root from second EPG
+            programme: Programme XML element
             
         Returns:
-            Dictionary mapping programme identifiers to image URLs
+            List of image URLs in the order they appear
         """
-        image_map = {}
+        # One walk over the subtree instead of a path search per tag; results are
+        # still grouped icons, images, posters, thumbnails as before
+        found = {'icon': [], 'image': [], 'poster': [], 'thumbnail': []}
+        for elem in programme.iter('icon', 'image', 'poster', 'thumbnail'):
+            if elem.tag == 'icon':
+                src = elem.get('src', '')
+                if src:
+                    found['icon'].append(src)
+            elif elem.text:
+                found[elem.tag].append(elem.text.strip())
         
-        for programme in epg2_root.findall('.//programme'):
-            # Build programme identifier from channel and time
-            channel = programme.get('channel', '')
-            start = programme.get('start', '')
+        return found['icon'] + found['image'] + found['poster'] + found['thumbnail']
+
+    def extract_epg2_data(self, epg2_content: str) -> Optional[Tuple[List[Tuple[str, str]], Dict[str, List[Tuple[datetime, List[str]]]]]]:
+        """
+        Extract channels and programme images from the second EPG in a single streaming pass.
+        
+        Args:
+            epg2_content: Raw EPG XML data from second EPG
             
-            if channel and start:
-                prog_id = f"{channel}_{start}"
-                
-                # Extract images from various elements
-                images = []
-                
-                # Look for icon elements
-                for icon in programme.findall('.//icon'):
-                    src = icon.get('src', '')
-                    if src:
-                        images.append(src)
-                
-                # Look for image elements
-                for img in programme.findall('.//image'):
-                    if img.text:
-                        images.append(img.text.strip())
+        Returns:
+            Tuple of (channel data for channels_epg2.csv, image map keyed by EPG2 channel ID),
+            None if parsing failed
+        """
+        channel_names = {}
+        programme_channels = {}
+        image_map = {}
+        programme_count = 0
+        
+        # Only programmes of mapped EPG2 channels can ever be merged, so skip the rest
+        mapped_epg2_channels = {epg2_channel for epg2_channel in self.channel_mapping.values() if epg2_channel}
+        
+        try:
+            for elem in self.iterparse_epg(io.BytesIO(epg2_content.encode('utf-8'))):
+                if elem.tag == 'channel':
+                    channel_id = elem.get('id', '').strip()
+                    if channel_id and channel_id not in channel_names:
+                        # Try to get channel name from display-name element
+                        channel_name = ""
+                        display_name = elem.find('display-name')
+                        if display_name is not None and display_name.text:
+                            channel_name = display_name.text.strip()
+                        
+                        channel_names[channel_id] = channel_name
+                    continue
                 
-                # Look for poster/thumbnail attributes or elements
-                for poster in programme.findall('.//poster'):
-                    if poster.text:
-                        images.append(poster.text.strip())
+                channel = elem.get('channel', '')
+                start = elem.get('start', '')
                 
-                for thumb in programme.findall('.//thumbnail'):
-                    if thumb.text:
-                        images.append(thumb.text.strip())
+                # Remember channels that only appear in programmes
+                if channel.strip():
+                    programme_channels[channel.strip()] = ""
                 
-                if images:
-                    image_map[prog_id] = images
-                    self.logger.debug(f"Found {len(images)} images for programme {prog_id}")
+                if start and channel in mapped_epg2_channels:
+                    images = self.get_programme_images(elem)
+                    start_time = self.parse_datetime(start) if images else None
+                    if start_time:
+                        # Index by channel so merging only looks at the mapped channel's programmes;
+                        # start times are parsed here once
+                        image_map.setdefault(channel, []).append((start_time, images))
+                        programme_count += 1
+                        self.logger.debug(f"Found {len(images)} images for programme {channel}@{start}")
+                        
+        except ET.ParseError as e:
+            self.logger.error(f"XML parsing error in second EPG: {e}")
+            return None
         
-        self.logger.info(f"Extracted images for {len(image_map)} programmes from second EPG")
-        return image_map
+        # Sorted by start time so merging can binary search; the sort is stable, so
+        # programmes starting at the same time keep document order
+        for timed_images in image_map.values():
+            timed_images.sort(key=lambda item: item[0])
+        
+        # Channel elements take precedence over IDs only seen on programmes
+        programme_channels.update(channel_names)
+        channel_data = list(programme_channels.items())
+        
+        self.logger.info(f"Extracted images for {programme_count} programmes of mapped channels from second EPG")
+        return channel_data, image_map
 
-    def merge_programme_images(self, main_root: ET.Element, image_map: Dict[str, List[str]]) -> int:
+    def merge_programme_images(self, main_root: ET.Element, image_map: Dict[str, List[Tuple[datetime, List[str]]]]) -> int:
         """
         Merge images from the second EPG into the main EPG programmes using channel mapping.
         
         Args:
             main_root: Main EPG XML root element
-            image_map: Dictionary mapping programme identifiers to image URLs
+            image_map: Dictionary mapping EPG2 channel IDs to (start time, image URLs) tuples sorted by start
             
         Returns:
             Number of programmes that received images
@@ -561,15 +855,24 @@ class EPGCacher:
             self.logger.info("No channel mappings available for image merging")
             return merged_count
         
+        tolerance = self.time_tolerance
+        
+        # One walk over the tree instead of a search per mapped channel
+        programmes_by_channel = self.group_programmes_by_channel(main_root)
+        
         # Loop through every assigned EPG1 channel id -> EPG2 channel id mapping
         for epg1_channel, epg2_channel in self.channel_mapping.items():
             if not epg2_channel:  # Skip empty EPG2 mappings
                 continue
                 
+            epg2_programmes = image_map.get(epg2_channel)
+            if not epg2_programmes:  # No images available for the mapped EPG2 channel
+                continue
+            
             self.logger.debug(f"Processing channel mapping: {epg1_channel} -> {epg2_channel}")
             
             # Find all programmes for this EPG1 channel
-            epg1_programmes = main_root.findall(f".//programme[@channel='{epg1_channel}']")
+            epg1_programmes = programmes_by_channel.get(epg1_channel, [])
             
             # Loop through every programme in this channel
             for epg1_programme in epg1_programmes:
@@ -581,32 +884,14 @@ class EPGCacher:
                 if not epg1_start_time:
                     continue
                 
-                # Find matching programme in EPG2 based on start time
+                # Find matching programme in EPG2 based on start time: the earliest
+                # EPG2 programme starting within the tolerance window
                 matched_images = None
-                tolerance = timedelta(minutes=self.time_tolerance_minutes)
-                
-                # Search through EPG2 programmes for this channel
-                for prog_id, images in image_map.items():
-                    # Check if this image belongs to the mapped EPG2 channel
-                    if not prog_id.startswith(f"{epg2_channel}_"):
-                        continue
-                    
-                    # Extract start time from prog_id
-                    parts = prog_id.split('_', 1)
-                    if len(parts) >= 2:
-                        epg2_start_str = parts[1]
-                        epg2_start_time = self.parse_datetime(epg2_start_str)
-                        
-                        if epg2_start_time:
-                            # Normalize for comparison
-                            epg1_start_naive = epg1_start_time.replace(tzinfo=None) if epg1_start_time.tzinfo else epg1_start_time
-                            epg2_start_naive = epg2_start_time.replace(tzinfo=None) if epg2_start_time.tzinfo else epg2_start_time
-                            
-                            time_diff = abs(epg1_start_naive - epg2_start_naive)
-                            if time_diff <= tolerance:
-                                matched_images = images
-                                self.logger.debug(f"Time match found: {epg1_channel}@{epg1_start} -> {epg2_channel}@{epg2_start_str} (diff: {time_diff})")
-                                break
+                index = bisect.bisect_left(epg2_programmes, epg1_start_time - tolerance, key=lambda item: item[0])
+                if index < len(epg2_programmes) and epg2_programmes[index][0] <= epg1_start_time + tolerance:
+                    epg2_start_time, matched_images = epg2_programmes[index]
+                    self.logger.debug(f"Time match found: {epg1_channel}@{epg1_start} -> {epg2_channel}@{epg2_start_time} "
+                                      f"(diff: {abs(epg1_start_time - epg2_start_time)})")
                 
                 # Add images if found
                 if matched_images:
@@ -615,17 +900,15 @@ class EPGCacher:
                     for icon in existing_icons:
                         epg1_programme.remove(icon)
                     
-                    # Add new images
+                    # Add new images as fresh elements so nothing is shared with the EPG2 data
                     for i, image_url in enumerate(matched_images):
-                        icon = ET.SubElement(epg1_programme, 'icon')
-                        icon.set('src', image_url)
-                        
                         if i == 0:
-                            icon.set('width', '300')
-                            icon.set('height', '200')
+                            ET.SubElement(epg1_programme, 'icon', src=image_url, width='300', height='200')
+                        else:
+                            ET.SubElement(epg1_programme, 'icon', src=image_url)
                     
                     merged_count += 1
-                    self.logger.info(f"Added {len(matched_images)} images to programme {epg1_channel} at {epg1_start}")
+                    self.logger.debug(f"Added {len(matched_images)} images to programme {epg1_channel} at {epg1_start}")
         
         return merged_count
 
@@ -633,12 +916,24 @@ class EPGCacher:
         """
         Backup current epg.xml to epg_old.xml.
         
+        The backup is a hard link, so no data is copied and the current file stays in
+        place; the new EPG is written to a temporary file and renamed over it, which
+        leaves the linked backup with the old contents.
+        
         Returns:
             True if backup successful or no current file exists, False on error
         """
+        tmp_file = self.epg_old_file + ".tmp"
         try:
             if os.path.exists(self.epg_file):
-                shutil.copy2(self.epg_file, self.epg_old_file)
+                if os.path.lexists(tmp_file):
+                    os.remove(tmp_file)
+                try:
+                    os.link(self.epg_file, tmp_file)
+                except OSError:
+                    # Filesystems without hard links get a real copy
+                    shutil.copy2(self.epg_file, tmp_file)
+                os.replace(tmp_file, self.epg_old_file)
                 self.logger.info(f"Backed up {self.epg_file} to {self.epg_old_file}")
             else:
                 self.logger.info(f"No existing {self.epg_file} to backup")
@@ -647,22 +942,42 @@ class EPGCacher:
             self.logger.error(f"Failed to backup EPG file: {e}")
             return False
 
-    def parse_epg_xml(self, xml_content: str) -> Optional[ET.Element]:
+    def create_xml_parser(self) -> ET.XMLParser:
+        """
+        Create an lxml parser for XMLTV documents.
+        
+        The content has already been decoded and sanitized, so it is always
+        handed to the parser as UTF-8 regardless of the declared encoding.
+        Parsing is strict: the result replaces the saved EPG, so a truncated
+        download must fail instead of recovering into a partial tree.
+        
+        Returns:
+            New XMLParser instance (parsers are not shared between threads)
+        """
+        return ET.XMLParser(encoding='utf-8', huge_tree=True, remove_blank_text=True)
+
+    def parse_epg_xml(self, xml_content: bytes) -> Optional[ET.Element]:
         """
         Parse EPG XML content.
         
         Args:
-            xml_content: XML content as string
+            xml_content: XML content as UTF-8 bytes
             
         Returns:
             Parsed XML root element, None if parsing failed
         """
         try:
-            # Clean up common XML issues
+            # Clean up common XML issues (returns the same object when there is nothing to strip)
             xml_content = xml_content.strip()
             
             # Parse the XML
-            root = ET.fromstring(xml_content)
+            root = ET.fromstring(xml_content, self.create_xml_parser())
+            
+            # A well-formed document that is not an XMLTV guide (e.g. an error page
+            # served with status 200) must not replace the saved EPG either
+            if root.tag != 'tv' or root.find('programme') is None:
+                self.logger.error(f"EPG XML has no programmes (root element <{root.tag}>), ignoring it")
+                return None
             return root
         except ET.ParseError as e:
             self.logger.error(f"XML parsing error: {e}")
@@ -684,6 +999,39 @@ class EPGCacher:
         if not dt_str:
             return None
         
+        parsed = self._parse_datetime_cached(dt_str)
+        if parsed is None:
+            self.logger.warning(f"Could not parse datetime: {dt_str}")
+        return parsed
+
+    @staticmethod
+    @functools.lru_cache(maxsize=65536)
+    def _parse_datetime_cached(dt_str: str) -> Optional[datetime]:
+        """
+        Parse a datetime string, memoized since EPG grids repeat the same start/stop times.
+        
+        Values with a UTC offset are converted to UTC and returned naive, so results from
+        feeds in different zones compare directly; values without one are returned as is.
+        
+        Args:
+            dt_str: Datetime string in various EPG formats
+            
+        Returns:
+            Parsed naive datetime object, None if parsing failed
+        """
+        # Fast path for the XMLTV "YYYYmmddHHMMSS [+HHMM]" forms used by nearly every feed
+        match = EPGCacher.XMLTV_DATETIME.fullmatch(dt_str)
+        if match:
+            year, month, day, hour, minute, second, sign, offset_hours, offset_minutes = match.groups()
+            try:
+                local_time = datetime(int(year), int(month), int(day), int(hour), int(minute), int(second))
+            except ValueError:
+                return None
+            if not sign:
+                return local_time
+            offset = timedelta(hours=int(offset_hours), minutes=int(offset_minutes))
+            return local_time + offset if sign == '-' else local_time - offset
+        
         # Common EPG datetime formats
         formats = [
             '%Y%m%d%H%M%S %z',  # XMLTV format with timezone
@@ -695,11 +1043,13 @@ class EPGCacher:
         
         for fmt in formats:
             try:
-                return datetime.strptime(dt_str, fmt)
+                parsed = datetime.strptime(dt_str, fmt)
             except ValueError:
                 continue
+            if parsed.tzinfo:
+                parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+            return parsed
         
-        self.logger.warning(f"Could not parse datetime: {dt_str}")
         return None
 
     def is_valid_programme_date(self, text) -> bool:
@@ -736,6 +1086,23 @@ class EPGCacher:
 
         return False
 
+    def group_programmes_by_channel(self, root: ET.Element) -> Dict[str, List[ET.Element]]:
+        """
+        Bucket all programme elements by their channel attribute in a single pass.
+        
+        Args:
+            root: EPG XML root element
+            
+        Returns:
+            Dictionary mapping channel ID to its programmes in document order
+        """
+        programmes_by_channel = {}
+        
+        # XMLTV programmes are direct children of <tv>; no need to walk their subtrees
+        for programme in root.iterchildren('programme'):
+            programmes_by_channel.setdefault(programme.get('channel', ''), []).append(programme)
+        return programmes_by_channel
+
     def get_programme_time_range(self, programme: ET.Element) -> Tuple[Optional[datetime], Optional[datetime]]:
         """
         Extract start and stop times from a programme element.
@@ -754,6 +1121,32 @@ class EPGCacher:
         
         return start_time, stop_time
 
+    def build_overlap_index(self, programmes: List[ET.Element]) -> Tuple[List[datetime], List[datetime]]:
+        """
+        Index programmes for overlap lookups by binary search.
+        
+        Args:
+            programmes: Programme elements of one channel
+            
+        Returns:
+            Tuple of (start times sorted ascending, running maximum of the stop times in
+            that order); programmes without parseable start and stop are left out
+        """
+        time_ranges = []
+        for programme in programmes:
+            start_time, stop_time = self.get_programme_time_range(programme)
+            if start_time and stop_time:
+                time_ranges.append((start_time, stop_time))
+        time_ranges.sort(key=lambda item: item[0])
+        
+        starts = []
+        max_stops = []
+        for start_time, stop_time in time_ranges:
+            starts.append(start_time)
+            max_stops.append(max(stop_time, max_stops[-1]) if max_stops else stop_time)
+        
+        return starts, max_stops
+
     def programmes_overlap(self, prog1: ET.Element, prog2: ET.Element) -> bool:
         """
         Check if two programmes overlap within the time tolerance.
@@ -775,7 +1168,7 @@ class EPGCacher:
         assert start1 is not None and stop1 is not None
         assert start2 is not None and stop2 is not None
         
-        tolerance = timedelta(minutes=self.time_tolerance_minutes)
+        tolerance = self.time_tolerance
         
         # Check if programmes overlap with tolerance
         # prog1 starts before prog2 ends (with tolerance) AND prog1 ends after prog2 starts (with tolerance)
@@ -783,99 +1176,109 @@ class EPGCacher:
         
         return overlap
 
-    def merge_missing_programmes(self, new_root: ET.Element, old_root: ET.Element) -> int:
+    def merge_old_epg_file(self, new_root: ET.Element, path: str) -> Optional[Tuple[int, int]]:
         """
-        Merge missing programmes from old EPG into new EPG.
+        Merge channels and programmes missing from the new EPG out of the old EPG file.
+        
+        The old file is streamed rather than parsed into a tree; only the elements that
+        end up merged are copied, everything else is freed as soon as it has been checked.
         
         Args:
             new_root: New EPG XML root element
-            old_root: Old EPG XML root element
+            path: Path of the old EPG file
             
         Returns:
-            Number of programmes merged
+            Tuple of (channels merged, programmes merged), None if parsing failed
         """
-        merged_count = 0
+        # Get existing channel IDs in new EPG
+        new_channel_ids = {channel.get('id', '') for channel in new_root.iterchildren('channel')}
+        
+        # Index the new programmes of each channel once for overlap lookups
+        new_programmes_by_channel = self.group_programmes_by_channel(new_root)
+        overlap_indexes = {}
+        
+        tolerance = self.time_tolerance
+        one_day_ago = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=1)
+        
+        missing_channels = []
+        missing_programmes_by_channel = {}
         
-        # Get all programmes from both EPGs organized by channel
-        new_programmes_by_channel = {}
-        old_programmes_by_channel = {}
-        
-        # Organize new programmes by channel
-        for programme in new_root.findall('.//programme'):
-            channel = programme.get('channel', '')
-            if channel not in new_programmes_by_channel:
-                new_programmes_by_channel[channel] = []
-            new_programmes_by_channel[channel].append(programme)
-        
-        # Organize old programmes by channel
-        for programme in old_root.findall('.//programme'):
-            channel = programme.get('channel', '')
-            if channel not in old_programmes_by_channel:
-                old_programmes_by_channel[channel] = []
-            old_programmes_by_channel[channel].append(programme)
-        
-        # For each channel in old EPG, check for missing programmes
-        for channel, old_programmes in old_programmes_by_channel.items():
-            new_programmes = new_programmes_by_channel.get(channel, [])
-            
-            for old_programme in old_programmes:
-                # Skip programs older than 1 day
-                start_time, _ = self.get_programme_time_range(old_programme)
-                if start_time:
-                    # Normalize datetimes for comparison (remove timezone info if present)
-                    start_time_naive = start_time.replace(tzinfo=None) if start_time.tzinfo else start_time
-                    one_day_ago = datetime.now() - timedelta(days=1)
-                    if start_time_naive < one_day_ago:
-                        continue  # Skip this old programme
+        try:
+            for elem in self.iterparse_epg(path):
+                if elem.tag == 'channel':
+                    channel_id = elem.get('id', '')
+                    if channel_id and channel_id not in new_channel_ids:
+                        # Copied, since the streamed element is cleared once we move on
+                        missing_channels.append(copy.deepcopy(elem))
+                    continue
+                
+                channel = elem.get('channel', '')
+                start_time, stop_time = self.get_programme_time_range(elem)
+                
+                # Skip programs older than 1 day (parsed times are naive UTC)
+                if start_time and start_time < one_day_ago:
+                    continue
                 
-                # Check if this programme is missing in new EPG
+                if channel not in overlap_indexes:
+                    overlap_indexes[channel] = self.build_overlap_index(new_programmes_by_channel.get(channel, []))
+                new_starts, new_max_stops = overlap_indexes[channel]
+                
+                # Check if this programme is missing in new EPG (same test as programmes_overlap):
+                # some new programme starting by stop + tolerance must end at or after
+                # start - tolerance, i.e. the latest stop among those candidates must
                 is_missing = True
                 
-                for new_programme in new_programmes:
-                    if self.programmes_overlap(old_programme, new_programme):
+                if start_time and stop_time:
+                    candidates = bisect.bisect_right(new_starts, stop_time + tolerance)
+                    if candidates and new_max_stops[candidates - 1] + tolerance >= start_time:
                         is_missing = False
-                        break
                 
                 if is_missing:
-                    # Add the missing programme to new EPG
-                    new_root.append(old_programme)
-                    merged_count += 1
+                    missing_programmes_by_channel.setdefault(channel, []).append(copy.deepcopy(elem))
+                    self.logger.debug(f"Merged missing programme for channel {channel}: "
+                                      f"{start_time} - {stop_time}")
                     
-                    start_time, stop_time = self.get_programme_time_range(old_programme)
-                    self.logger.info(f"Merged missing programme for channel {channel}: "
-                                   f"{start_time} - {stop_time}")
+        except ET.ParseError as e:
+            self.logger.error(f"XML parsing error in {path}: {e}")
+            return None
         
-        return merged_count
+        # Add the missing elements to new EPG: channels first, then programmes grouped by channel
+        for channel in missing_channels:
+            new_root.append(channel)
+            self.logger.debug(f"Merged missing channel: {channel.get('id')}")
+        
+        merged_programmes = 0
+        for programmes in missing_programmes_by_channel.values():
+            for programme in programmes:
+                new_root.append(programme)
+                merged_programmes += 1
+        
+        if merged_programmes:
+            self.logger.info(f"Merged missing programmes for {len(missing_programmes_by_channel)} channels")
+        
+        return len(missing_channels), merged_programmes
 
-    def merge_missing_channels(self, new_root: ET.Element, old_root: ET.Element) -> int:
+    def write_xml_file(self, root: ET.Element, path: str):
         """
-        Merge missing channel information from old EPG into new EPG.
+        Serialize an EPG tree to a UTF-8 file with lxml's incremental writer.
+        
+        Top-level elements are written one at a time straight to the file, so the
+        whole document is never held as a single string. Text in the tree came
+        from sanitized input and lxml rejects invalid XML characters, so the
+        output needs no further sanitizing. The file is written under a temporary
+        name and renamed into place, so readers never see a partial document.
         
         Args:
-            new_root: New EPG XML root element
-            old_root: Old EPG XML root element
-            
-        Returns:
-            Number of channels merged
+            root: XML root element to save
+            path: Destination file path
         """
-        merged_count = 0
-        
-        # Get existing channel IDs in new EPG
-        new_channel_ids = set()
-        for channel in new_root.findall('.//channel'):
-            channel_id = channel.get('id', '')
-            if channel_id:
-                new_channel_ids.add(channel_id)
-        
-        # Add missing channels from old EPG
-        for old_channel in old_root.findall('.//channel'):
-            channel_id = old_channel.get('id', '')
-            if channel_id and channel_id not in new_channel_ids:
-                new_root.append(old_channel)
-                merged_count += 1
-                self.logger.info(f"Merged missing channel: {channel_id}")
-        
-        return merged_count
+        tmp_path = path + ".tmp"
+        with ET.xmlfile(tmp_path, encoding='utf-8') as xf:
+            xf.write_declaration()
+            with xf.element(root.tag, dict(root.attrib), nsmap=root.nsmap):
+                for child in root:
+                    xf.write(child)
+        os.replace(tmp_path, path)
 
     def save_epg_file(self, root: ET.Element) -> bool:
         """
@@ -890,7 +1293,7 @@ class EPGCacher:
         try:
             # Remove <date> elements whose content is not a valid date
             removed_date_count = 0
-            for programme in root.findall('.//programme'):
+            for programme in root.iterchildren('programme'):
                 for date_elem in programme.findall('date'):
                     if not self.is_valid_programme_date(date_elem.text):
                         programme.remove(date_elem)
@@ -898,19 +1301,8 @@ class EPGCacher:
             if removed_date_count:
                 self.logger.info(f"Removed {removed_date_count} invalid/empty <date> elements from programmes")
 
-            # Create XML string with proper declaration
-            xml_str = ET.tostring(root, encoding='unicode', method='xml')
-            
-            # Add XML declaration if not present
-            if not xml_str.startswith('<?xml'):
-                xml_str = '<?xml version="1.0" encoding="UTF-8"?>\n' + xml_str
-            
-            # Sanitize the final XML content
-            xml_str = self.sanitize_utf8(xml_str)
-            
-            # Write to file with UTF-8 encoding
-            with codecs.open(self.epg_file, 'w', encoding='utf-8') as f:
-                f.write(xml_str)
+            # Stream to file with UTF-8 encoding
+            self.write_xml_file(root, self.epg_file)
             
             self.logger.info(f"Successfully saved EPG file: {self.epg_file}")
             return True
@@ -919,17 +1311,15 @@ class EPGCacher:
             self.logger.error(f"Failed to save EPG file: {e}")
             return False
         
-    def plex_safe_channel_id(self, raw_id: str) -> str:
+    def load_plex_channel_ids(self) -> Dict[str, str]:
         """
-        Map raw channel IDs to persistent Plex-safe IDs using a CSV mapping.
-        Workflow:
-        1. Check if mapping file exists; create if not.
-        2. If raw_id already exists in mapping, return mapped ID.
-        3. Otherwise, assign next numeric ID and save to mapping.
+        Load the persistent raw ID -> Plex-safe ID mapping, creating the file if needed.
+        
+        Returns:
+            Dictionary mapping raw channel IDs to Plex-safe IDs
         """
         # Ensure mapping file exists
         if not os.path.exists(self.channel_id_mapping_file):
-            os.makedirs(os.path.dirname(self.channel_id_mapping_file), exist_ok=True)
             with open(self.channel_id_mapping_file, "w", newline="", encoding="utf-8") as f:
                 writer = csv.writer(f)
                 writer.writerow(["raw_id", "mapped_id"])  # header
@@ -940,23 +1330,39 @@ class EPGCacher:
             reader = csv.DictReader(f)
             for row in reader:
                 mapping[row["raw_id"]] = row["mapped_id"]
+        
+        return mapping
+
+    def plex_safe_channel_id(self, raw_id: str) -> str:
+        """
+        Map raw channel IDs to persistent Plex-safe IDs using a CSV mapping.
+        Workflow:
+        1. Load the mapping file once (creating it if needed) and keep it in memory.
+        2. If raw_id already exists in mapping, return mapped ID.
+        3. Otherwise, assign next numeric ID and append it to the mapping file.
+        """
+        # The file is only ever appended to by this method, so the in-memory copy stays current
+        if self.plex_channel_ids is None:
+            self.plex_channel_ids = self.load_plex_channel_ids()
+            self.plex_used_ids = set(self.plex_channel_ids.values())
+            self.plex_next_counter = 1
+        mapping = self.plex_channel_ids
 
         # If already mapped, return existing
         if raw_id in mapping:
             return mapping[raw_id]
 
-        # Otherwise, assign next number as new ID
+        # Otherwise, assign the lowest unused number as new ID
         # Example: CH001, CH002, CH003...
-        existing_ids = set(mapping.values())
-        counter = 1
-        while True:
-            new_id = f"ch{counter:03d}"
-            if new_id not in existing_ids:
-                break
-            counter += 1
+        # IDs are only ever added, so the lowest free number never goes down and the
+        # search resumes where the previous one stopped
+        while f"ch{self.plex_next_counter:03d}" in self.plex_used_ids:
+            self.plex_next_counter += 1
+        new_id = f"ch{self.plex_next_counter:03d}"
 
         # Save new mapping
         mapping[raw_id] = new_id
+        self.plex_used_ids.add(new_id)
         with open(self.channel_id_mapping_file, "a", newline="", encoding="utf-8") as f:
             writer = csv.writer(f)
             writer.writerow([raw_id, new_id])
@@ -965,43 +1371,43 @@ class EPGCacher:
 
         return new_id
     
-    def save_escaped_epg_file(self) -> bool:
+    def save_escaped_epg_file(self, root: ET.Element) -> bool:
         """
-        Read EPG XML from self.epg_file, escape all channel ids and programme channel refs
-        using plex_safe_channel_id(), and save to self.epg_file_escaped.
+        Escape all channel ids and programme channel refs of the EPG tree using
+        plex_safe_channel_id(), and save to self.epg_file_escaped.
+        
+        The tree is written as is, with each id swapped only while its element is
+        being serialized, so the unescaped EPG never has to be re-read from disk.
+        
+        Args:
+            root: XML root element of the saved EPG
+            
+        Returns:
+            True if save successful, False otherwise
         """
         try:
-            # Parse existing EPG file
-            tree = ET.parse(self.epg_file)
-            root = tree.getroot()
-
-            # Process all <channel> elements
-            for channel in root.findall("channel"):
+            # Assign ids to all <channel> elements before any <programme> refs, so
+            # new channels are numbered in channel order
+            for channel in root.iterchildren("channel"):
                 old_id = channel.get("id")
                 if old_id:
-                    new_id = self.plex_safe_channel_id(old_id)
-                    channel.set("id", new_id)
-
-            # Process all <programme> elements
-            for programme in root.findall("programme"):
-                old_channel = programme.get("channel")
-                if old_channel:
-                    new_channel = self.plex_safe_channel_id(old_channel)
-                    programme.set("channel", new_channel)
-
-            # Convert back to string
-            xml_str = ET.tostring(root, encoding="unicode", method="xml")
-
-            # Add XML declaration if not present
-            if not xml_str.startswith("<?xml"):
-                xml_str = '<?xml version="1.0" encoding="UTF-8"?>\n' + xml_str
-
-            # Sanitize XML content
-            xml_str = self.sanitize_utf8(xml_str)
-
-            # Write to new file
-            with codecs.open(self.epg_file_escaped, "w", encoding="utf-8") as f:
-                f.write(xml_str)
+                    self.plex_safe_channel_id(old_id)
+            
+            tmp_file = self.epg_file_escaped + ".tmp"
+            with ET.xmlfile(tmp_file, encoding='utf-8') as xf:
+                xf.write_declaration()
+                with xf.element(root.tag, dict(root.attrib), nsmap=root.nsmap):
+                    for child in root:
+                        # <channel> carries its id in "id", <programme> in "channel"
+                        attribute = "id" if child.tag == "channel" else "channel"
+                        old_id = child.get(attribute) if child.tag in ("channel", "programme") else None
+                        if old_id:
+                            child.set(attribute, self.plex_safe_channel_id(old_id))
+                            xf.write(child)
+                            child.set(attribute, old_id)
+                        else:
+                            xf.write(child)
+            os.replace(tmp_file, self.epg_file_escaped)
 
             self.logger.info(f"Successfully saved escaped EPG file: {self.epg_file_escaped}")
             return True
@@ -1010,6 +1416,54 @@ class EPGCacher:
             self.logger.error(f"Failed to save escaped EPG file: {e}")
             return False
 
+    def sources_unchanged(self, epg2_future) -> bool:
+        """
+        Check whether the last completed update was built from exactly the current inputs.
+        
+        Args:
+            epg2_future: Pending fetch_epg2_data() job, None if no image EPG is configured
+            
+        Returns:
+            True if both EPG sources answered 304 and the channel mapping is unchanged
+        """
+        if not self.update_completed or not self.epg_not_modified:
+            return False
+        if self.last_update_mapping_mtime != self.channel_mapping_mtime:
+            return False
+        
+        if epg2_future is not None:
+            epg2_future.result()  # Wait for the image EPG download to report its status
+            if not self.epg2_not_modified:
+                return False
+        
+        return True
+
+    def finish_fetch_jobs(self, *futures):
+        """
+        Cancel or wait for fetch pool jobs, so none of them outlives the update that started it.
+        
+        Jobs that already finished are left alone, pending ones are cancelled and
+        running ones are waited for. Any playlist download that was not turned into
+        the saved playlist is removed afterwards.
+        
+        Args:
+            futures: Jobs submitted by update_epg(), None for jobs that were not started
+        """
+        for future in futures:
+            if future is None or future.cancel():
+                continue
+            try:
+                future.result()
+            except Exception as e:
+                self.logger.warning(f"Background fetch failed: {e}")
+        
+        try:
+            os.remove(self.simpleiptv_download_file)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            self.logger.warning(f"Could not remove {self.simpleiptv_download_file}: {e}")
+
     def update_epg(self):
         """Main EPG update process."""
         self.logger.info("Starting EPG update process")
@@ -1018,18 +1472,35 @@ class EPGCacher:
             self.logger.info("This time is configured to be skipped from scanning")
             return
         
+        epg2_future = epg2_data_future = simpleiptv_future = None
         try:
+            # Pick up mapping edits made since the last run
+            self.refresh_channel_mapping()
+            
             # Step 1: Backup current EPG
             if not self.backup_current_epg():
                 self.logger.error("Failed to backup current EPG, aborting update")
                 return
             
-            # Step 2: Fetch new EPG data
+            # Step 2: Fetch new EPG data, downloading the image EPG and the playlist in parallel
+            epg2_future = self.fetch_executor.submit(self.fetch_epg2_data) if self.epg2_url else None
+            simpleiptv_future = self.fetch_executor.submit(self.download_simpleiptv)
             new_epg_content = self.fetch_epg_data()
             if not new_epg_content:
                 self.logger.error("Failed to fetch new EPG data, keeping existing file")
                 return
             
+            # Nothing changed since the last completed update, so the saved files are current
+            if self.sources_unchanged(epg2_future):
+                self.logger.info("EPG sources and channel mapping unchanged, keeping existing files")
+                if not self.fetch_simpleiptv(simpleiptv_future):
+                    self.logger.error("Failed to save SimpleIPTV file")
+                return
+            self.update_completed = False  # Until this update has written both files
+            
+            # Extract the image EPG only now that it is needed, still in parallel with the main EPG
+            epg2_data_future = self.fetch_executor.submit(self.load_epg2_data, epg2_future) if epg2_future else None
+            
             # Step 3: Parse new EPG data
             new_root = self.parse_epg_xml(new_epg_content)
             if new_root is None:
@@ -1045,14 +1516,10 @@ class EPGCacher:
             
             if os.path.exists(self.epg_old_file):
                 try:
-                    with codecs.open(self.epg_old_file, 'r', encoding='utf-8') as f:
-                        old_epg_content = f.read()
-                    
-                    old_root = self.parse_epg_xml(old_epg_content)
-                    if old_root is not None:
+                    merged_counts = self.merge_old_epg_file(new_root, self.epg_old_file)
+                    if merged_counts is not None:
                         # Merge missing channels and programmes
-                        merged_channels = self.merge_missing_channels(new_root, old_root)
-                        merged_programmes = self.merge_missing_programmes(new_root, old_root)
+                        merged_channels, merged_programmes = merged_counts
                         
                         self.logger.info(f"Merged {merged_channels} channels and "
                                        f"{merged_programmes} programmes from old EPG")
@@ -1065,24 +1532,20 @@ class EPGCacher:
             # Step 5: Fetch and merge images from second EPG if configured
             merged_images = 0
             if self.epg2_url:
-                epg2_content = self.fetch_epg2_data()
-                if epg2_content:
-                    epg2_root = self.parse_epg_xml(epg2_content)
-                    if epg2_root is not None:
-                        # Save EPG2 channels to separate CSV file
-                        self.save_epg2_channels_to_csv(epg2_root)
-                        
-                        # Extract and merge images
-                        image_map = self.extract_programme_images(epg2_root)
-                        merged_images = self.merge_programme_images(new_root, image_map)
-                        self.logger.info(f"Added images to {merged_images} programmes from second EPG")
-                    else:
-                        self.logger.warning("Could not parse second EPG file for images")
-                else:
-                    self.logger.warning("Could not fetch second EPG for images")
+                epg2_data = epg2_data_future.result() if epg2_data_future else None
+                if epg2_data is not None:
+                    channel_data, image_map = epg2_data
+                    
+                    # Save EPG2 channels to separate CSV file
+                    self.save_epg2_channels_to_csv(channel_data)
+                    
+                    # Merge images
+                    merged_images = self.merge_programme_images(new_root, image_map)
+                    self.logger.info(f"Added images to {merged_images} programmes from second EPG")
             
             # Step 6: Save updated EPG
-            if self.save_epg_file(new_root):
+            epg_saved = self.save_epg_file(new_root)
+            if epg_saved:
                 image_info = f", {merged_images} images" if merged_images > 0 else ""
                 self.logger.info(f"EPG update completed successfully. "
                                f"Merged: {merged_channels} channels, {merged_programmes} programmes{image_info}")
@@ -1090,35 +1553,47 @@ class EPGCacher:
                 self.logger.error("Failed to save updated EPG file")
             
             # Step 7: Save escaped EPG
-            if self.save_escaped_epg_file():
+            if self.save_escaped_epg_file(new_root):
                 self.logger.info(f"EPG escaped write completed successfully.")
+                if epg_saved:
+                    # Both files were written, remember what they were built from
+                    self.update_completed = True
+                    self.last_update_mapping_mtime = self.channel_mapping_mtime
             else:
                 self.logger.error("Failed to save escaped EPG file")
             
             # Step 7: Save escaped EPG
-            if self.fetch_simpleiptv():
+            if self.fetch_simpleiptv(simpleiptv_future):
                 self.logger.info(f"SimpleIPTV was saved successfully.")
             else:
                 self.logger.error("Failed to save SimpleIPTV file")
                 
         except Exception as e:
             self.logger.error(f"Unexpected error during EPG update: {e}")
+        finally:
+            # Early returns and errors leave downloads the update no longer needs running
+            self.finish_fetch_jobs(epg2_data_future, epg2_future, simpleiptv_future)
 
     def run_scheduler(self):
         """Run the hourly scheduler."""
         self.logger.info("Starting EPG cacher scheduler - updates every hour")
         
-        # Schedule hourly updates
-        schedule.every().hour.do(self.update_epg)
-        
-        # Run initial update
-        self.update_epg()
+        interval = 60 * 60
         
-        # Keep running and check for scheduled tasks
+        # Run the initial update now and the following ones on fixed hourly deadlines,
+        # so the time an update takes does not push every later update back
+        deadline = time.monotonic()
         while True:
             try:
-                schedule.run_pending()
-                time.sleep(60)  # Check every minute
+                self.update_epg()
+                
+                deadline += interval
+                delay = deadline - time.monotonic()
+                if delay <= 0:
+                    self.logger.warning("EPG update took longer than the update interval, starting the next one now")
+                    deadline = time.monotonic()
+                    continue
+                time.sleep(delay)
             except KeyboardInterrupt:
                 self.logger.info("Received interrupt signal, shutting down")
                 break
@@ -1,12 +1,14 @@
 # Gunicorn configuration file for EPG Channel Mapping Web UI
 
-# Server socket
-bind = "0.0.0.0:8000"
+# Server socket; nginx serves the public port 8000 and proxies to gunicorn on loopback
+bind = "127.0.0.1:8001"
 backlog = 2048
 
-# Worker processes
-workers = 2
-worker_class = "sync"
+# A single worker process, so every request sees the same in-process caches of the
+# mapping, channel and EPG files; its threads keep serving while a request waits on disk I/O
+workers = 1
+worker_class = "gthread"
+threads = 4
 worker_connections = 1000
 timeout = 30
 keepalive = 2
@@ -4,11 +4,16 @@ Main entry point for EPG Channel Mapping Web UI
 """
 
 import csv
+import fcntl
+from bisect import bisect_left, bisect_right
 import os
 import logging
-import xml.etree.ElementTree as ET
-from datetime import datetime, timedelta
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify
+import tempfile
+import threading
+from lxml import etree as ET
+from datetime import datetime, timedelta, timezone
+from flask import Flask, render_template, request, redirect, url_for, flash
+from contextlib import contextmanager
 from typing import List, Dict, Tuple, Optional
 
 app = Flask(__name__)
@@ -36,74 +41,286 @@ class ChannelMappingManager:
     
     def __init__(self, csv_file: str = CHANNEL_MAPPING_FILE):
         self.csv_file = csv_file
+        self.lock_file = csv_file + '.lock'
         self.channels_epg1_file = CHANNELS_EPG1_FILE
         self.channels_epg2_file = CHANNELS_EPG2_FILE
         
-    def load_mappings(self) -> List[Dict[str, str]]:
-        """Load all channel mappings from CSV file."""
-        mappings = []
+        # Path -> ((mtime_ns, size), parsed rows); files are only re-read after they change
+        self._csv_cache = {}
+        
+        # (file keys of the mapping and EPG1 channel files, stats computed from them)
+        self._stats_cache = None
+        
+        # (file keys of the mapping and EPG1 channel files, channel overview lists)
+        self._overview_cache = None
+        
+        # (file key of the EPG file, data extracted from it)
+        self._epg_cache = None
+        
+        # Serializes read-modify-write cycles on the mapping file between request threads;
+        # lock_file does the same between processes
+        self._write_lock = threading.Lock()
+        
+    def file_key(self, path: str) -> Optional[Tuple[int, int]]:
+        """Return (mtime_ns, size) identifying the current version of a file, None if it is missing."""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+    
+    def _load_cached(self, path: str, parse):
+        """
+        Return the rows parsed from a CSV file, re-parsing it only when it changed.
+        
+        Args:
+            path: CSV file to load
+            parse: Callable that reads and parses the file
+            
+        Returns:
+            The cached parsed rows, which callers must not modify; None if the file does not exist
+        """
+        key = self.file_key(path)
+        if key is None:
+            self._csv_cache.pop(path, None)
+            return None
+        
+        cached = self._csv_cache.get(path)
+        if cached is None or cached[0] != key:
+            cached = (key, parse())
+            self._csv_cache[path] = cached
+        
+        return cached[1]
+    
+    def _cached_mapping_dict(self) -> Dict[str, str]:
+        """Return the cached EPG1 -> EPG2 mapping dict, which must not be modified."""
+        mappings = self._load_cached(self.csv_file, self._parse_mappings)
         
-        if not os.path.exists(self.csv_file):
+        if mappings is None:
             logger.warning(f"CSV file {self.csv_file} not found")
-            return mappings
+            return {}
             
+        return mappings
+        
+    def load_mapping_dict(self) -> Dict[str, str]:
+        """Load all channel mappings from CSV file as an EPG1 -> EPG2 channel ID dict."""
+        # Callers add and remove mappings, so never hand out the cached dict itself
+        return dict(self._cached_mapping_dict())
+    
+    def load_mappings(self) -> List[Dict[str, str]]:
+        """Load all channel mappings from CSV file, as rows for templates and JSON."""
+        return [
+            {'epg1_channel': epg1_channel, 'epg2_channel': epg2_channel}
+            for epg1_channel, epg2_channel in self._cached_mapping_dict().items()
+        ]
+    
+    def _read_csv_pairs(self, path: str, first: str, second: str):
+        """
+        Yield two columns of every row of a CSV file as stripped strings.
+        
+        The header is resolved to column positions once, so rows are plain lists
+        instead of one dict per row. Missing columns and short rows read as ''.
+        
+        Args:
+            path: CSV file to read
+            first: Header name of the first column
+            second: Header name of the second column
+            
+        Yields:
+            Tuples of (first value, second value)
+        """
+        with open(path, 'r', encoding='utf-8', newline='', buffering=1 << 16) as f:
+            reader = csv.reader(f)
+            header = next(reader, [])
+            first_index = header.index(first) if first in header else None
+            second_index = header.index(second) if second in header else None
+            
+            for row in reader:
+                if not row:
+                    continue
+                columns = len(row)
+                yield (row[first_index].strip() if first_index is not None and first_index < columns else '',
+                       row[second_index].strip() if second_index is not None and second_index < columns else '')
+    
+    def _parse_mappings(self) -> Dict[str, str]:
+        """Parse all channel mappings from CSV file, keyed by EPG1 channel ID."""
+        mappings = {}
+        
         try:
-            with open(self.csv_file, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    epg1_channel = row.get('EPG1_Channel_ID', '').strip()
-                    epg2_channel = row.get('EPG2_Channel_ID', '').strip()
-                    
-                    mappings.append({
-                        'epg1_channel': epg1_channel,
-                        'epg2_channel': epg2_channel
-                    })
+            # A repeated EPG1 channel keeps its first position and its last EPG2 channel,
+            # the same entry the EPG cacher ends up using
+            for epg1_channel, epg2_channel in self._read_csv_pairs(self.csv_file, 'EPG1_Channel_ID', 'EPG2_Channel_ID'):
+                mappings[epg1_channel] = epg2_channel
                     
         except Exception as e:
             logger.error(f"Error loading mappings: {e}")
             
         return mappings
     
-    def save_mappings(self, mappings: List[Dict[str, str]]) -> bool:
-        """Save channel mappings to CSV file."""
+    def has_mapping(self, epg1_channel: str) -> bool:
+        """Check whether the mapping file already has a row for an EPG1 channel."""
+        return epg1_channel in self._cached_mapping_dict()
+    
+    @contextmanager
+    def _mapping_file_lock(self):
+        """
+        Hold an exclusive lock for a read-modify-write cycle on the mapping file.
+        
+        The lock is taken on a separate lock file: save_mappings() replaces the
+        mapping file, so a lock on the file itself would not carry over to the new one.
+        """
+        with self._write_lock, open(self.lock_file, 'a') as lock:
+            # Released when the lock file is closed
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            yield
+    
+    def save_mappings(self, mappings: Dict[str, str]) -> bool:
+        """Save channel mappings to CSV file; callers modifying loaded mappings hold the mapping file lock."""
+        # Write a uniquely named temporary file and rename it into place, so neither the
+        # loaders here nor the EPG cacher ever read a partially written file
+        tmp_file = None
+        
         try:
-            with open(self.csv_file, 'w', encoding='utf-8', newline='') as f:
+            fd, tmp_file = tempfile.mkstemp(dir=os.path.dirname(self.csv_file) or '.',
+                                            prefix=os.path.basename(self.csv_file) + '.', suffix='.tmp')
+            
+            # mkstemp creates the file private to its owner; keep the mapping file's permissions
+            try:
+                os.chmod(tmp_file, os.stat(self.csv_file).st_mode & 0o7777)
+            except FileNotFoundError:
+                os.chmod(tmp_file, 0o644)
+            
+            with os.fdopen(fd, 'w', encoding='utf-8', newline='', buffering=1 << 16) as f:
                 writer = csv.writer(f)
                 
                 # Write header
                 writer.writerow(['EPG1_Channel_ID', 'EPG2_Channel_ID'])
                 
                 # Write mappings
-                for mapping in mappings:
-                    epg1 = mapping.get('epg1_channel', '').strip()
-                    epg2 = mapping.get('epg2_channel', '').strip()
-                    writer.writerow([epg1, epg2])
+                saved = {epg1.strip(): epg2.strip() for epg1, epg2 in mappings.items()}
+                writer.writerows(saved.items())
+            os.replace(tmp_file, self.csv_file)
+            
+            # The saved rows are exactly what the next load would parse, so cache them
+            key = self.file_key(self.csv_file)
+            if key is not None:
+                self._csv_cache[self.csv_file] = (key, saved)
                     
             logger.info(f"Saved {len(mappings)} mappings to {self.csv_file}")
             return True
             
         except Exception as e:
             logger.error(f"Error saving mappings: {e}")
+            
+            # Don't leave a partial temporary file behind; the mapping file itself is untouched
+            if tmp_file is not None:
+                try:
+                    os.remove(tmp_file)
+                except OSError:
+                    pass
+            return False
+    
+    def remove_mapping(self, epg1_channel: str) -> Optional[bool]:
+        """
+        Remove the mapping of an EPG1 channel and save the mapping file.
+        
+        Loading, removing and saving happen under the mapping file lock, so
+        concurrent requests cannot save over each other's changes.
+        
+        Args:
+            epg1_channel: EPG1 channel ID to remove
+            
+        Returns:
+            True if the mapping was removed, False if saving failed, None if the channel has no mapping
+        """
+        with self._mapping_file_lock():
+            mappings = self.load_mapping_dict()
+            if epg1_channel not in mappings:
+                return None
+            
+            del mappings[epg1_channel]
+            return self.save_mappings(mappings)
+    
+    def append_mapping(self, epg1_channel: str, epg2_channel: str) -> Optional[bool]:
+        """
+        Append a single channel mapping to the CSV file without rewriting it.
+        
+        The duplicate check and the append happen under the mapping file lock, so
+        an append cannot land between another request's load and save.
+        
+        Args:
+            epg1_channel: EPG1 channel ID
+            epg2_channel: EPG2 channel ID, may be empty
+            
+        Returns:
+            True if the mapping was appended, False on error, None if the EPG1 channel is already mapped
+        """
+        epg1_channel = epg1_channel.strip()
+        epg2_channel = epg2_channel.strip()
+        
+        try:
+            with self._mapping_file_lock():
+                if self.has_mapping(epg1_channel):
+                    return None
+                
+                key = self.file_key(self.csv_file)
+                cached = self._csv_cache.get(self.csv_file)
+                
+                # A new file needs its header, and a hand-edited last row may lack its line break
+                prefix = ''
+                if not key or not key[1]:
+                    prefix = 'EPG1_Channel_ID,EPG2_Channel_ID\r\n'
+                else:
+                    with open(self.csv_file, 'rb') as f:
+                        f.seek(-1, os.SEEK_END)
+                        if f.read(1) not in (b'\n', b'\r'):
+                            prefix = '\r\n'
+                
+                with open(self.csv_file, 'a', encoding='utf-8', newline='') as f:
+                    f.write(prefix)
+                    csv.writer(f).writerow([epg1_channel, epg2_channel])
+                
+                # Extend the cached mappings instead of re-parsing the file, if they were current
+                new_key = self.file_key(self.csv_file)
+                if cached is not None and cached[0] == key and new_key is not None:
+                    mappings = dict(cached[1])
+                    mappings[epg1_channel] = epg2_channel
+                    self._csv_cache[self.csv_file] = (new_key, mappings)
+            
+            logger.info(f"Appended mapping for {epg1_channel} to {self.csv_file}")
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error appending mapping: {e}")
             return False
     
     def get_stats(self) -> Dict[str, int]:
         """Get statistics about channel mappings based on both mapping file and EPG1 channels."""
-        mappings = self.load_mappings()
-        epg1_channels = self.load_epg1_channels()
-        
-        # Get all unique EPG1 channel IDs from both sources
-        mapped_channel_ids = {m['epg1_channel'] for m in mappings if m['epg1_channel']}
-        epg1_channel_ids = {ch['id'] for ch in epg1_channels}
-        all_channel_ids = mapped_channel_ids.union(epg1_channel_ids)
+        # The stats only change when one of the two files does
+        key = (self.file_key(self.csv_file), self.file_key(self.channels_epg1_file))
+        if self._stats_cache is not None and self._stats_cache[0] == key:
+            return dict(self._stats_cache[1])
         
-        # Count channels that have actual mappings (both EPG1 and EPG2)
-        mapped_channels = len([m for m in mappings if m['epg1_channel'] and m['epg2_channel']])
+        mappings = self._cached_mapping_dict()
+        epg1_channels = self.load_epg1_channels()
         
-        # Count pseudo-unmapped channels (mapped but no EPG2)
-        pseudo_unmapped_channels = len([m for m in mappings if m['epg1_channel'] and not m['epg2_channel']])
+        # Single pass over the mappings: collect mapped EPG1 IDs and count channels that
+        # have actual mappings (both EPG1 and EPG2) and pseudo-unmapped ones (no EPG2)
+        mapped_channel_ids = set()
+        mapped_channels = 0
+        pseudo_unmapped_channels = 0
+        for epg1_channel, epg2_channel in mappings.items():
+            if not epg1_channel:
+                continue
+            mapped_channel_ids.add(epg1_channel)
+            if epg2_channel:
+                mapped_channels += 1
+            else:
+                pseudo_unmapped_channels += 1
         
         # Total is all unique channels from both sources
-        total_channels = len(all_channel_ids)
+        mapped_channel_ids.update(ch['id'] for ch in epg1_channels)
+        total_channels = len(mapped_channel_ids)
         
         # Unmapped is total minus mapped
         unmapped_channels = total_channels - mapped_channels
@@ -113,7 +330,7 @@ class ChannelMappingManager:
         pseudo_unmapped_percentage = (pseudo_unmapped_channels / total_channels * 100) if total_channels > 0 else 0.0
         total_completion_percentage = ((mapped_channels + pseudo_unmapped_channels) / total_channels * 100) if total_channels > 0 else 0.0
         
-        return {
+        stats = {
             'total': total_channels,
             'mapped': mapped_channels,
             'unmapped': unmapped_channels,
@@ -122,59 +339,75 @@ class ChannelMappingManager:
             'pseudo_unmapped_percentage': round(float(pseudo_unmapped_percentage), 1),
             'total_completion_percentage': round(float(total_completion_percentage), 1)
         }
+        self._stats_cache = (key, stats)
+        
+        return dict(stats)
     
-    def get_unmapped_channels(self) -> List[Dict[str, str]]:
-        """Get channels from EPG1 that are not in the mapping file at all."""
-        mappings = self.load_mappings()
+    def get_channel_overview(self) -> Tuple[List[Dict[str, str]], List[Dict[str, str]]]:
+        """
+        Get unmapped and pseudo-unmapped channels from a single load of both CSV files.
+        
+        Returns:
+            Tuple of (EPG1 channels not in the mapping file at all,
+            channels in the mapping file with no EPG2 channel assigned)
+        """
+        # Like the stats, the overview only changes when one of the two files does
+        key = (self.file_key(self.csv_file), self.file_key(self.channels_epg1_file))
+        if self._overview_cache is not None and self._overview_cache[0] == key:
+            unmapped, pseudo_unmapped = self._overview_cache[1]
+            return list(unmapped), list(pseudo_unmapped)
+        
+        mappings = self._cached_mapping_dict()
         epg1_channels = self.load_epg1_channels()
         
-        # Get channel IDs that are already in mappings
-        mapped_channel_ids = {m['epg1_channel'] for m in mappings if m['epg1_channel']}
-        
-        # Return EPG1 channels that are not in mappings at all
-        unmapped = [ch for ch in epg1_channels if ch['id'] not in mapped_channel_ids]
+        # One pass over the EPG1 channels: collect those not in mappings at all (channel
+        # IDs are never empty) and the names for the pseudo-unmapped list
+        epg1_lookup = {}
+        unmapped = []
+        for ch in epg1_channels:
+            epg1_lookup[ch['id']] = ch['name']
+            if ch['id'] not in mappings:
+                unmapped.append(ch)
         
-        return unmapped
+        # Find mappings with EPG1 but no EPG2
+        pseudo_unmapped = [
+            {'id': epg1_channel, 'name': epg1_lookup.get(epg1_channel, epg1_channel)}
+            for epg1_channel, epg2_channel in mappings.items()
+            if epg1_channel and not epg2_channel
+        ]
+        self._overview_cache = (key, (unmapped, pseudo_unmapped))
+        
+        return list(unmapped), list(pseudo_unmapped)
+    
+    def get_unmapped_channels(self) -> List[Dict[str, str]]:
+        """Get channels from EPG1 that are not in the mapping file at all."""
+        return self.get_channel_overview()[0]
     
     def get_pseudo_unmapped_channels(self) -> List[Dict[str, str]]:
         """Get channels that are in mapping file but have no EPG2 channel assigned."""
-        mappings = self.load_mappings()
-        epg1_channels = self.load_epg1_channels()
-        
-        # Create a lookup for EPG1 channel names
-        epg1_lookup = {ch['id']: ch['name'] for ch in epg1_channels}
-        
-        # Find mappings with EPG1 but no EPG2
-        pseudo_unmapped = []
-        for mapping in mappings:
-            if mapping['epg1_channel'] and not mapping['epg2_channel']:
-                pseudo_unmapped.append({
-                    'id': mapping['epg1_channel'],
-                    'name': epg1_lookup.get(mapping['epg1_channel'], mapping['epg1_channel'])
-                })
-        
-        return pseudo_unmapped
+        return self.get_channel_overview()[1]
     
     def load_epg1_channels(self) -> List[Dict[str, str]]:
         """Load EPG1 channels from channels_epg1.csv file."""
-        epg1_channels = []
+        epg1_channels = self._load_cached(self.channels_epg1_file, self._parse_epg1_channels)
         
-        if not os.path.exists(self.channels_epg1_file):
+        if epg1_channels is None:
             logger.info(f"EPG1 channels CSV file {self.channels_epg1_file} not found")
-            return epg1_channels
+            return []
             
+        return list(epg1_channels)
+    
+    def _parse_epg1_channels(self) -> List[Dict[str, str]]:
+        """Parse EPG1 channels from channels_epg1.csv file."""
+        epg1_channels = []
+        
         try:
-            with open(self.channels_epg1_file, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    channel_id = row.get('EPG1_Channel_ID', '').strip()
-                    channel_name = row.get('Channel_Name', '').strip()
-                    
-                    if channel_id:
-                        epg1_channels.append({
-                            'id': channel_id,
-                            'name': channel_name or channel_id
-                        })
+            for channel_id, channel_name in self._read_csv_pairs(self.channels_epg1_file, 'EPG1_Channel_ID', 'Channel_Name'):
+                if channel_id:
+                    epg1_channels.append({
+                        'id': channel_id,
+                        'name': channel_name or channel_id
+                    })
                         
         except Exception as e:
             logger.error(f"Error loading EPG1 channels: {e}")
@@ -183,24 +416,25 @@ class ChannelMappingManager:
 
     def load_epg2_channels(self) -> List[Dict[str, str]]:
         """Load EPG2 channels from channels_epg2.csv file."""
-        epg2_channels = []
+        epg2_channels = self._load_cached(self.channels_epg2_file, self._parse_epg2_channels)
         
-        if not os.path.exists(self.channels_epg2_file):
+        if epg2_channels is None:
             logger.info(f"EPG2 channels CSV file {self.channels_epg2_file} not found")
-            return epg2_channels
+            return []
             
+        return list(epg2_channels)
+    
+    def _parse_epg2_channels(self) -> List[Dict[str, str]]:
+        """Parse EPG2 channels from channels_epg2.csv file."""
+        epg2_channels = []
+        
         try:
-            with open(self.channels_epg2_file, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    channel_id = row.get('EPG2_Channel_ID', '').strip()
-                    channel_name = row.get('Channel_Name', '').strip()
-                    
-                    if channel_id:
-                        epg2_channels.append({
-                            'id': channel_id,
-                            'name': channel_name or channel_id
-                        })
+            for channel_id, channel_name in self._read_csv_pairs(self.channels_epg2_file, 'EPG2_Channel_ID', 'Channel_Name'):
+                if channel_id:
+                    epg2_channels.append({
+                        'id': channel_id,
+                        'name': channel_name or channel_id
+                    })
                         
         except Exception as e:
             logger.error(f"Error loading EPG2 channels: {e}")
@@ -210,6 +444,14 @@ class ChannelMappingManager:
     def parse_datetime(self, datetime_str: str) -> Optional[datetime]:
         """Parse XMLTV datetime format (YYYYMMDDHHMMSS +TTTT)."""
         try:
+            # Fast path for the usual full XMLTV timestamp, without strptime
+            prefix = datetime_str[:14]
+            if len(prefix) == 14 and prefix.isascii() and prefix.isdigit():
+                return datetime(
+                    int(datetime_str[0:4]), int(datetime_str[4:6]), int(datetime_str[6:8]),
+                    int(datetime_str[8:10]), int(datetime_str[10:12]), int(datetime_str[12:14])
+                )
+            
             # XMLTV format: 20240821120000 +0000
             if ' ' in datetime_str:
                 dt_part = datetime_str.split(' ')[0]
@@ -228,51 +470,149 @@ class ChannelMappingManager:
         except ValueError:
             return None
     
-    def load_epg_data(self) -> Optional[ET.Element]:
-        """Load and parse EPG XML data."""
-        if not os.path.exists(EPG_FILE):
+    def iter_epg_elements(self):
+        """
+        Stream channel and programme elements from the EPG file.
+        
+        Each element is cleared together with its already processed siblings once
+        the caller moves on, so memory stays flat even on large EPG files.
+        
+        Yields:
+            channel and programme elements in document order
+        """
+        for _, elem in ET.iterparse(EPG_FILE, tag=('channel', 'programme'), recover=True, huge_tree=True):
+            yield elem
+            
+            elem.clear(keep_tail=True)
+            parent = elem.getparent()
+            if parent is not None:
+                while elem.getprevious() is not None:
+                    del parent[0]
+    
+    def load_epg_data(self) -> Optional[Dict]:
+        """
+        Load EPG XML data in a single streaming pass, re-parsing only when the file changed.
+        
+        Returns:
+            Dictionary with:
+                channels: id/name of every channel element, in document order
+                programmes: channel ID -> programmes sorted by start time
+                programme_channel_ids: channel IDs referenced by programme elements
+                programme_index: channel ID -> (start times, running maximum of stop times)
+            None if the file is missing or cannot be parsed.
+            The data is shared between requests, so callers must not modify it.
+        """
+        key = self.file_key(EPG_FILE)
+        if key is None:
             return None
+        if self._epg_cache is not None and self._epg_cache[0] == key:
+            return self._epg_cache[1]
+        
+        channels = []
+        programmes = {}
+        programme_channel_ids = {}
         
         try:
-            tree = ET.parse(EPG_FILE)
-            return tree.getroot()
+            for elem in self.iter_epg_elements():
+                if elem.tag == 'channel':
+                    channel_id = elem.get('id', '').strip()
+                    if channel_id:
+                        # Get channel name from display-name
+                        display_name = elem.findtext('display-name')
+                        channel_name = display_name.strip() if display_name else channel_id
+                        
+                        channels.append({
+                            'id': channel_id,
+                            'name': channel_name
+                        })
+                    continue
+                
+                channel_id = elem.get('channel', '').strip()
+                if not channel_id:
+                    continue
+                programme_channel_ids[channel_id] = None
+                
+                # Parse programme times
+                start_str = elem.get('start', '')
+                stop_str = elem.get('stop', '')
+                
+                prog_start = self.parse_datetime(start_str)
+                if not prog_start:
+                    continue
+                prog_stop = self.parse_datetime(stop_str)
+                
+                # Get programme details; findtext gives '' for a missing or empty element
+                title = elem.findtext('title', '').strip()
+                desc = elem.findtext('desc', '').strip()
+                
+                # Get programme icon
+                icon_elem = elem.find('icon')
+                icon_url = icon_elem.get('src', '').strip() if icon_elem is not None else ""
+                
+                # Add programme to channel
+                if channel_id not in programmes:
+                    programmes[channel_id] = []
+                
+                programmes[channel_id].append({
+                    'start': prog_start,
+                    'stop': prog_stop,
+                    'start_str': start_str,
+                    'stop_str': stop_str,
+                    'title': title or 'No Title',
+                    'desc': desc,
+                    'icon': icon_url
+                })
         except ET.ParseError as e:
             logger.error(f"Error parsing EPG XML: {e}")
             return None
         except Exception as e:
             logger.error(f"Error loading EPG file: {e}")
             return None
+        
+        # Sort programmes by start time for each channel and index them for bisecting;
+        # the running maximum of stop times (open-ended programmes count as never
+        # stopping) is non-decreasing, so it can be bisected like the start times
+        programme_index = {}
+        for channel_id, channel_programmes in programmes.items():
+            channel_programmes.sort(key=lambda x: x['start'])
+            
+            starts = []
+            stop_reach = []
+            reach = datetime.min
+            for programme in channel_programmes:
+                starts.append(programme['start'])
+                reach = max(reach, programme['stop'] or datetime.max)
+                stop_reach.append(reach)
+            programme_index[channel_id] = (starts, stop_reach)
+        
+        epg_data = {
+            'channels': channels,
+            'programmes': programmes,
+            'programme_channel_ids': list(programme_channel_ids),
+            'programme_index': programme_index
+        }
+        self._epg_cache = (key, epg_data)
+        
+        return epg_data
     
     def get_epg_channels(self) -> List[Dict[str, str]]:
         """Get channels from EPG data."""
-        epg_root = self.load_epg_data()
-        if epg_root is None:
+        epg_data = self.load_epg_data()
+        if epg_data is None:
             return []
         
         channels = []
         channel_ids_seen = set()
         
         # Get channels from channel elements
-        for channel in epg_root.findall('.//channel'):
-            channel_id = channel.get('id', '').strip()
-            if channel_id and channel_id not in channel_ids_seen:
-                channel_ids_seen.add(channel_id)
-                
-                # Get channel name from display-name
-                channel_name = channel_id
-                display_name = channel.find('display-name')
-                if display_name is not None and display_name.text:
-                    channel_name = display_name.text.strip()
-                
-                channels.append({
-                    'id': channel_id,
-                    'name': channel_name
-                })
+        for channel in epg_data['channels']:
+            if channel['id'] not in channel_ids_seen:
+                channel_ids_seen.add(channel['id'])
+                channels.append(dict(channel))
         
         # Also get channels from programme elements if not in channel list
-        for programme in epg_root.findall('.//programme'):
-            channel_id = programme.get('channel', '').strip()
-            if channel_id and channel_id not in channel_ids_seen:
+        for channel_id in epg_data['programme_channel_ids']:
+            if channel_id not in channel_ids_seen:
                 channel_ids_seen.add(channel_id)
                 channels.append({
                     'id': channel_id,
@@ -282,77 +622,65 @@ class ChannelMappingManager:
         return sorted(channels, key=lambda x: x['name'].lower())
     
     def get_epg_programmes(self, start_time: datetime, hours: int = 12) -> Dict[str, List[Dict]]:
-        """Get EPG programmes for a specific time window."""
-        epg_root = self.load_epg_data()
-        if epg_root is None:
+        """Get EPG programmes for a specific time window; the programme dicts are shared and must not be modified."""
+        epg_data = self.load_epg_data()
+        if epg_data is None:
             return {}
         
         end_time = start_time + timedelta(hours=hours)
         programmes_by_channel = {}
         
-        for programme in epg_root.findall('.//programme'):
-            channel_id = programme.get('channel', '').strip()
-            if not channel_id:
-                continue
-            
-            # Parse programme times
-            start_str = programme.get('start', '')
-            stop_str = programme.get('stop', '')
-            
-            prog_start = self.parse_datetime(start_str)
-            prog_stop = self.parse_datetime(stop_str)
+        for channel_id, programmes in epg_data['programmes'].items():
+            starts, stop_reach = epg_data['programme_index'][channel_id]
             
-            if not prog_start:
-                continue
-            
-            # Check if programme overlaps with our time window
-            if prog_stop and prog_stop <= start_time:
-                continue  # Programme ends before our window
-            if prog_start >= end_time:
-                continue  # Programme starts after our window
-            
-            # Get programme details
-            title = ""
-            title_elem = programme.find('title')
-            if title_elem is not None and title_elem.text:
-                title = title_elem.text.strip()
-            
-            desc = ""
-            desc_elem = programme.find('desc')
-            if desc_elem is not None and desc_elem.text:
-                desc = desc_elem.text.strip()
-
-            # Get programme icon
-            icon_url = ""
-            icon_elem = programme.find('icon')
-            if icon_elem is not None:
-                icon_url = icon_elem.get('src', '').strip()
-            
-            # Add programme to channel
-            
-            # Add programme to channel
-            if channel_id not in programmes_by_channel:
-                programmes_by_channel[channel_id] = []
-            
-            programmes_by_channel[channel_id].append({
-                'start': prog_start,
-                'stop': prog_stop,
-                'start_str': start_str,
-                'stop_str': stop_str,
-                'title': title or 'No Title',
-                'desc': desc,
-                'icon': icon_url
-            })
-        
-        # Sort programmes by start time for each channel
-        for channel_id in programmes_by_channel:
-            programmes_by_channel[channel_id].sort(key=lambda x: x['start'])
+            # Everything before lo stops by start_time and everything from hi on
+            # starts after the window; only the range between needs checking
+            lo = bisect_right(stop_reach, start_time)
+            hi = bisect_left(starts, end_time)
+            in_window = [
+                programme for programme in programmes[lo:hi]
+                if not (programme['stop'] and programme['stop'] <= start_time)
+            ]
+            if in_window:
+                programmes_by_channel[channel_id] = in_window
         
         return programmes_by_channel
 
 # Initialize manager
 mapping_manager = ChannelMappingManager()
 
+# Endpoint -> (file keys, serialized JSON body) for the file-backed API endpoints
+json_cache = {}
+
+def cached_json_response(endpoint: str, paths: Tuple[str, ...], build):
+    """
+    Serve a JSON payload built from data files, serializing it only when a file changed.
+    
+    The response carries an ETag and Last-Modified derived from the files, so
+    clients revalidating an unchanged payload get a 304 without a body.
+    
+    Args:
+        endpoint: Name the serialized body is cached under
+        paths: Files the payload is built from
+        build: Callable returning the payload
+        
+    Returns:
+        JSON response with the same body jsonify() would produce
+    """
+    key = tuple(mapping_manager.file_key(path) for path in paths)
+    cached = json_cache.get(endpoint)
+    if cached is None or cached[0] != key:
+        cached = (key, app.json.response(build()).get_data())
+        json_cache[endpoint] = cached
+    
+    response = app.response_class(cached[1], mimetype=app.json.mimetype)
+    response.set_etag('-'.join(f"{file_key[0]:x}.{file_key[1]:x}" if file_key else '0' for file_key in key))
+    mtimes = [file_key[0] for file_key in key if file_key]
+    if mtimes:
+        response.last_modified = datetime.fromtimestamp(max(mtimes) / 1e9, tz=timezone.utc)
+    
+    return response.make_conditional(request)
+
 # Error handlers for header/request size issues
 @app.errorhandler(413)
 def request_entity_too_large(error):
@@ -370,9 +698,9 @@ def bad_request(error):
 def clear_large_session():
     """Clear session if it becomes too large."""
     try:
-        # Estimate session size
-        session_size = len(str(request.cookies.get('session', '')))
-        if session_size > 3000:  # If session cookie is larger than 3KB
+        # Most requests carry no session cookie at all
+        session_cookie = request.cookies.get('session')
+        if session_cookie and len(session_cookie) > 3000:  # If session cookie is larger than 3KB
             from flask import session
             session.clear()
             logger.warning("Cleared large session data")
@@ -383,8 +711,7 @@ def clear_large_session():
 def index():
     """Main dashboard showing channel mapping overview."""
     stats = mapping_manager.get_stats()
-    unmapped_channels = mapping_manager.get_unmapped_channels()
-    pseudo_unmapped_channels = mapping_manager.get_pseudo_unmapped_channels()
+    unmapped_channels, pseudo_unmapped_channels = mapping_manager.get_channel_overview()
     return render_template('index.html', 
                          stats=stats, 
                          unmapped_channels=unmapped_channels,
@@ -397,14 +724,19 @@ def mappings():
     epg1_channels = mapping_manager.load_epg1_channels()
     epg2_channels = mapping_manager.load_epg2_channels()
     
-    # Filter out EPG1 channels that are already mapped
-    existing_epg1_channels = {mapping['epg1_channel'] for mapping in mappings if mapping['epg1_channel']}
+    # Filter out EPG1 channels that are already mapped; the mapping dict is keyed by EPG1 ID
+    # and channel IDs are never empty
+    existing_epg1_channels = mapping_manager.load_mapping_dict()
     available_epg1_channels = [channel for channel in epg1_channels if channel['id'] not in existing_epg1_channels]
     
+    # EPG2 channel names by ID, so the table looks each mapping's name up directly
+    epg2_channel_names = {channel['id']: channel['name'] for channel in epg2_channels}
+    
     return render_template('mappings.html', 
                          mappings=mappings, 
                          epg1_channels=available_epg1_channels, 
-                         epg2_channels=epg2_channels)
+                         epg2_channels=epg2_channels,
+                         epg2_channel_names=epg2_channel_names)
 
 @app.route('/add_mapping', methods=['POST'])
 def add_mapping():
@@ -417,23 +749,12 @@ def add_mapping():
             flash('EPG1 Channel ID is required.', 'error')
             return redirect(url_for('mappings'))
         
-        # Load existing mappings
-        mappings = mapping_manager.load_mappings()
+        # Add new mapping as a single appended row, unless the EPG1 channel already exists
+        added = mapping_manager.append_mapping(epg1_channel, epg2_channel)
         
-        # Check if EPG1 channel already exists
-        for mapping in mappings:
-            if mapping['epg1_channel'] == epg1_channel:
-                flash(f'EPG1 channel "{epg1_channel}" already exists.', 'warning')
-                return redirect(url_for('mappings'))
-        
-        # Add new mapping
-        mappings.append({
-            'epg1_channel': epg1_channel,
-            'epg2_channel': epg2_channel
-        })
-        
-        # Save updated mappings
-        if mapping_manager.save_mappings(mappings):
+        if added is None:
+            flash(f'EPG1 channel "{epg1_channel}" already exists.', 'warning')
+        elif added:
             flash(f'Added new channel mapping for "{epg1_channel}".', 'success')
         else:
             flash('Error adding channel mapping.', 'error')
@@ -454,21 +775,15 @@ def delete_mapping():
             flash('EPG1 Channel ID is required for deletion.', 'error')
             return redirect(url_for('mappings'))
         
-        # Load existing mappings
-        mappings = mapping_manager.load_mappings()
-        
-        # Filter out the mapping to delete
-        original_count = len(mappings)
-        mappings = [m for m in mappings if m['epg1_channel'] != epg1_channel]
+        # Remove the mapping and save the remaining ones
+        removed = mapping_manager.remove_mapping(epg1_channel)
         
-        if len(mappings) == original_count:
+        if removed is None:
             flash(f'Channel mapping for "{epg1_channel}" not found.', 'warning')
+        elif removed:
+            flash(f'Deleted channel mapping for "{epg1_channel}".', 'success')
         else:
-            # Save updated mappings
-            if mapping_manager.save_mappings(mappings):
-                flash(f'Deleted channel mapping for "{epg1_channel}".', 'success')
-            else:
-                flash('Error deleting channel mapping.', 'error')
+            flash('Error deleting channel mapping.', 'error')
                 
     except Exception as e:
         logger.error(f"Error deleting mapping: {e}")
@@ -479,26 +794,23 @@ def delete_mapping():
 @app.route('/api/stats')
 def api_stats():
     """API endpoint for channel mapping statistics."""
-    stats = mapping_manager.get_stats()
-    return jsonify(stats)
+    return cached_json_response('stats', (mapping_manager.csv_file, mapping_manager.channels_epg1_file),
+                                mapping_manager.get_stats)
 
 @app.route('/api/mappings')
 def api_mappings():
     """API endpoint for channel mappings."""
-    mappings = mapping_manager.load_mappings()
-    return jsonify(mappings)
+    return cached_json_response('mappings', (mapping_manager.csv_file,), mapping_manager.load_mappings)
 
 @app.route('/api/epg1_channels')
 def api_epg1_channels():
     """API endpoint for EPG1 channels."""
-    epg1_channels = mapping_manager.load_epg1_channels()
-    return jsonify(epg1_channels)
+    return cached_json_response('epg1_channels', (mapping_manager.channels_epg1_file,), mapping_manager.load_epg1_channels)
 
 @app.route('/api/epg2_channels')
 def api_epg2_channels():
     """API endpoint for EPG2 channels."""
-    epg2_channels = mapping_manager.load_epg2_channels()
-    return jsonify(epg2_channels)
+    return cached_json_response('epg2_channels', (mapping_manager.channels_epg2_file,), mapping_manager.load_epg2_channels)
 
 @app.route('/epg')
 def epg_viewer():
@@ -511,82 +823,31 @@ def epg_viewer():
 @app.route('/api/epg_data')
 def api_epg_data():
     """API endpoint to get full EPG data for client-side caching."""
-    epg_root = mapping_manager.load_epg_data()
-    if epg_root is None:
-        return jsonify({'programmes': {}, 'error': 'No EPG data available'})
-    
-    programmes_json = {}
-    channels = []
-    
-    # Get channels first
-    for channel in epg_root.findall('.//channel'):
-        channel_id = channel.get('id', '').strip()
-        if channel_id:
-            channel_name = channel_id
-            display_name = channel.find('display-name')
-            if display_name is not None and display_name.text:
-                channel_name = display_name.text.strip()
-            
-            channels.append({
-                'id': channel_id,
-                'name': channel_name
-            })
-    
-    # Get programmes
-    
-    for programme in epg_root.findall('.//programme'):
-        channel_id = programme.get('channel', '').strip()
-        if not channel_id:
-            continue
-        
-        # Parse programme times
-        start_str = programme.get('start', '')
-        stop_str = programme.get('stop', '')
-        
-        prog_start = mapping_manager.parse_datetime(start_str)
-        prog_stop = mapping_manager.parse_datetime(stop_str)
-        
-        if not prog_start:
-            continue
-        
-        # Get programme details
-        title = ""
-        title_elem = programme.find('title')
-        if title_elem is not None and title_elem.text:
-            title = title_elem.text.strip()
-        
-        desc = ""
-        desc_elem = programme.find('desc')
-        if desc_elem is not None and desc_elem.text:
-            desc = desc_elem.text.strip()
-        
-        # Get programme icon
-        icon_url = ""
-        icon_elem = programme.find('icon')
-        if icon_elem is not None:
-            icon_url = icon_elem.get('src', '').strip()
-        
-        # Add programme to channel
-        if channel_id not in programmes_json:
-            programmes_json[channel_id] = []
-        
-        programmes_json[channel_id].append({
-            'start': prog_start.isoformat(),
-            'stop': prog_stop.isoformat() if prog_stop else None,
-            'title': title or 'No Title',
-            'desc': desc,
-            'icon': icon_url
-        })
-    
-    # Sort programmes by start time for each channel
-    for channel_id in programmes_json:
-        programmes_json[channel_id].sort(key=lambda x: x['start'])
-    
-    return jsonify({
-        'programmes': programmes_json,
-        'channels': channels,
-        'source': 'xml'
-    })
+    def build() -> Dict:
+        epg_data = mapping_manager.load_epg_data()
+        if epg_data is None:
+            return {'programmes': {}, 'error': 'No EPG data available'}
+        
+        programmes_json = {
+            channel_id: [{
+                'start': programme['start'].isoformat(),
+                'stop': programme['stop'].isoformat() if programme['stop'] else None,
+                'title': programme['title'],
+                'desc': programme['desc'],
+                'icon': programme['icon']
+            } for programme in programmes]
+            for channel_id, programmes in epg_data['programmes'].items()
+        }
+        
+        return {
+            'programmes': programmes_json,
+            'channels': epg_data['channels'],
+            'source': 'xml'
+        }
+    
+    # The payload only changes with the EPG file, so repeat hits are served from cache
+    return cached_json_response('epg_data', (EPG_FILE,), build)
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=8000, debug=True)
\ No newline at end of file
+    # Development server only; the container serves the app through gunicorn
+    app.run(host='0.0.0.0', port=8000, debug=os.environ.get('FLASK_DEBUG', '0') == '1', threaded=True)
\ No newline at end of file